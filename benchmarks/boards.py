@@ -0,0 +1,80 @@
+"""Corpus of saved mid-game boards for the benchmarks.
+
+The boards are taken from seeded headless AutoPlayer games, every few
+pieces, at the moment a new block starts to fall.  Regenerate boards.json
+with:
+
+    python benchmarks/boards.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tetris import Block, BlockField, GameSnapshot, GameState, HeadlessController, Model, Simulator
+
+BOARDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "boards.json")
+TILE_COLOUR = "#888"
+
+class SavedBoard:
+    """A board from boards.json, as a BlockField, a Model or a GameSnapshot."""
+    def __init__(self, board):
+        self.__tiles = [
+            tuple(TILE_COLOUR if tile == "x" else 0 for tile in row)
+            for row in board["tiles"]
+        ]
+        self.__falling_block_type = board["falling"]
+        self.__falling_block_position = tuple(board["position"])
+        self.__next_block_type = board["next"]
+
+    def blockfield(self):
+        return BlockField.from_tiles(self.__tiles)
+
+    def model(self):
+        """A live, non-realtime Model holding this board."""
+        model = Model(HeadlessController(), realtime=False)
+        (block_x, block_y) = self.__falling_block_position
+        model.copy_in_state(
+            False,
+            self.blockfield(),
+            Block(self.__falling_block_type, block_x, block_y, True),
+            Block(self.__next_block_type, 0, 0, False),
+        )
+        return model
+
+    def snapshot(self):
+        """The GameSnapshot the AutoPlayer searches on for this board."""
+        return GameSnapshot(GameState(self.model()))
+
+def capture(gamestate, seed, piece):
+    return {
+        "seed": seed,
+        "piece": piece,
+        "tiles": ["".join("x" if tile else "." for tile in row) for row in gamestate.get_tiles()],
+        "falling": gamestate.get_falling_block_type(),
+        "position": list(gamestate.get_falling_block_position()),
+        "next": gamestate.get_next_block_type(),
+        "score": gamestate.get_score(),
+    }
+
+def generate_boards(seeds=range(8), every=20, max_pieces=160):
+    """Play one game per seed and save the board every ``every`` pieces."""
+    boards = []
+    for seed in seeds:
+        simulator = Simulator(seed)
+        for landed in simulator.steps(max_pieces):
+            pieces = simulator.model.landings
+            if landed and pieces % every == 0 and not simulator.controller.lost:
+                boards.append(capture(simulator.gamestate, seed, pieces))
+    return boards
+
+def load_boards(path=BOARDS_PATH):
+    with open(path, "r") as f:
+        return [SavedBoard(board) for board in json.load(f)]
+
+if __name__ == "__main__":
+    boards = generate_boards()
+    with open(BOARDS_PATH, "w") as f:
+        f.write("[\n" + ",\n".join(json.dumps(board) for board in boards) + "\n]\n")
+    print(f"saved {len(boards)} boards to {BOARDS_PATH}")
@@ -0,0 +1,38 @@
+"""A stand-in for tkinter.Canvas that only counts item operations."""
+from collections import Counter
+
+class MockCanvas:
+    OPERATIONS = ("create_rectangle", "create_text", "itemconfig", "coords", "move", "delete")
+
+    def __init__(self):
+        self.ops = Counter()
+        self.items = set()
+        self.__next_item = 0
+
+    def __create(self, kind):
+        self.ops[kind] += 1
+        self.__next_item += 1
+        self.items.add(self.__next_item)
+        return self.__next_item
+
+    def create_rectangle(self, *args, **kwargs):
+        return self.__create("create_rectangle")
+
+    def create_text(self, *args, **kwargs):
+        return self.__create("create_text")
+
+    def itemconfig(self, item, **kwargs):
+        self.ops["itemconfig"] += 1
+
+    def coords(self, item, *args):
+        self.ops["coords"] += 1
+
+    def move(self, item, dx, dy):
+        self.ops["move"] += 1
+
+    def delete(self, *items):
+        self.ops["delete"] += 1
+        self.items.difference_update(items)
+
+    def total_ops(self):
+        return sum(self.ops.values())
@@ -0,0 +1,335 @@
+"""Reproducible benchmarks for the engine, the AutoPlayer and the renderer.
+
+Every benchmark uses fixed seeds or the saved boards in boards.json, and
+none of them needs a display: the renderer is measured on a mock canvas
+that counts item operations (pass --tk to use a real Tk canvas, e.g.
+under xvfb-run).  Results are written as JSON and compared against a
+stored baseline:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --save-baseline
+
+--quick runs are shorter, so they have a baseline of their own.  The
+process exits with status 1 when a result is worse than the baseline by
+more than --tolerance, and with status 2 when the baseline was recorded
+in a different mode.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tetris
+from tetris import (
+    AutoPlayer, BitBlockField, Block, BlockView, BlockfieldView, GameState,
+    HeadlessController, MAXCOL, Model, Simulator, VectorEnv, percentile,
+)
+from boards import load_boards
+from mock_canvas import MockCanvas
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+QUICK_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline-quick.json")
+# Report settings that change what the results measure; a baseline is only
+# comparable with a run that has the same ones.
+MODE_KEYS = ("quick", "numpy")
+BLOCK_TYPES = ("I", "J", "L", "O", "S", "T", "Z")
+SEEDS = (0, 1, 2, 3)
+LAND_CALLS = 20000
+
+def result(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+MIN_RUN_SECONDS = 0.05
+
+def calls_per_second(func, calls, repeat):
+    """Throughput of func(), which makes ``calls`` calls, as timeit would.
+
+    func() is run often enough per measurement to take MIN_RUN_SECONDS,
+    and the fastest of ``repeat`` measurements is kept.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= MIN_RUN_SECONDS:
+            break
+        number *= 2
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return calls * number / best
+
+def resting_blocks(blockfield):
+    """Every block type at every column, dropped to where it would land."""
+    blocks = []
+    for block_type in BLOCK_TYPES:
+        for block_x in range(MAXCOL):
+            block = Block(block_type, block_x, 0, True)
+            if blockfield.collision(block, 0, 0):
+                continue
+            block_y = 0
+            while not blockfield.collision(block, 0, block_y + 1):
+                block_y += 1
+            blocks.append(Block(block_type, block_x, block_y, True))
+    return blocks
+
+def bench_blockfield(name, fields, repeat):
+    """collision/land/check_full_rows throughput of one field engine."""
+    cases = [(field, block) for field in fields for block in resting_blocks(field)]
+    probes = [(field, block, yoffset) for (field, block) in cases for yoffset in (-1, 0, 1)]
+
+    def collisions():
+        for (field, block, yoffset) in probes:
+            field.collision(block, 0, yoffset)
+
+    def check_rows():
+        for field in fields:
+            field.check_full_rows()
+
+    # land mutates its field, so every measurement lands on fresh clones
+    # made outside the timed region.
+    rounds = max(1, int(LAND_CALLS / len(cases)))
+    land_rate = 0.0
+    for _ in range(repeat):
+        clones = [(field.clone(), block) for _ in range(rounds) for (field, block) in cases]
+        start = time.perf_counter()
+        for (field, block) in clones:
+            field.land(block)
+        land_rate = max(land_rate, len(clones) / (time.perf_counter() - start))
+
+    return {
+        name + ".collision": result(calls_per_second(collisions, len(probes), repeat), "calls/s", "higher"),
+        name + ".land": result(land_rate, "calls/s", "higher"),
+        name + ".check_full_rows": result(calls_per_second(check_rows, len(fields), repeat), "calls/s", "higher"),
+    }
+
+def bench_engine(boards, repeat):
+    fields = [board.blockfield() for board in boards]
+    results = bench_blockfield("blockfield", fields, repeat)
+    bitfields = [BitBlockField.from_tiles(field.bitmap) for field in fields]
+    results.update(bench_blockfield("bitblockfield", bitfields, repeat))
+    return results
+
+def bench_clone(boards, repeat):
+    models = [board.model() for board in boards]
+    results = {}
+    for (name, is_dummy) in (("model.clone", False), ("model.clone_dummy", True)):
+        def clones():
+            for model in models:
+                model.clone(is_dummy)
+        results[name] = result(calls_per_second(clones, len(models), repeat), "clones/s", "higher")
+    return results
+
+def bench_best_move(snapshots, settings_by_name):
+    results = {}
+    for name, settings in settings_by_name.items():
+        autoplayer = AutoPlayer()
+        autoplayer.configure(settings)
+        latencies = []
+        for snapshot in snapshots:
+            start = time.perf_counter()
+            autoplayer.best_move(snapshot)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[name + ".p50_ms"] = result(percentile(latencies, 0.50), "ms", "lower")
+        results[name + ".p95_ms"] = result(percentile(latencies, 0.95), "ms", "lower")
+        stats = autoplayer.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        results[name + ".cache_hit_rate"] = result(stats["hits"] / lookups if lookups else 0.0, "hits/lookup", "higher")
+    return results
+
+def bench_headless(max_pieces):
+    results = {}
+    for (prefix, instant) in (("headless", False), ("headless_instant", True)):
+        start = time.perf_counter()
+        pieces = hits = lookups = 0
+        for seed in SEEDS:
+            autoplayer = AutoPlayer()
+            autoplayer.instantPlacement = instant
+            pieces += Simulator(seed, autoplayer).play(max_pieces)["pieces"]
+            hits += autoplayer.cache.hits
+            lookups += autoplayer.cache.hits + autoplayer.cache.misses
+        seconds = time.perf_counter() - start
+        results[prefix + ".games_per_second"] = result(len(SEEDS) / seconds, "games/s", "higher")
+        results[prefix + ".pieces_per_second"] = result(pieces / seconds, "pieces/s", "higher")
+        results[prefix + ".cache_hit_rate"] = result(hits / lookups if lookups else 0.0, "hits/lookup", "higher")
+    return results
+
+def bench_vector_env(count, steps):
+    """Pieces per second of VectorEnv games played by its greedy policy."""
+    env = VectorEnv(count, seed=SEEDS[0])
+    autoplayer = AutoPlayer()
+    pieces = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        (_, _, done) = env.step(env.greedy_actions(autoplayer))
+        pieces += count - int(done.sum())
+        env.reset(done.nonzero()[0])
+    seconds = time.perf_counter() - start
+    return {"vector_env.pieces_per_second": result(pieces / seconds, "pieces/s", "higher")}
+
+class RenderController(HeadlessController):
+    """Draws a headless game the way Controller and View do, and times it."""
+    def __init__(self, canvas, seed):
+        HeadlessController.__init__(self, seed)
+        self.canvas = canvas
+        self.blockfield_view = BlockfieldView(canvas)
+        self.block_views = []
+        self.render_seconds = 0.0
+
+    def register_block(self, block):
+        self.block_views.append(BlockView(block))
+
+    def unregister_block(self, block):
+        start = time.perf_counter()
+        for block_view in self.block_views[:]:
+            if block_view.block is block:
+                block_view.erase(self.canvas)
+                self.block_views.remove(block_view)
+        self.render_seconds += time.perf_counter() - start
+
+    def update_blockfield(self, blockfield):
+        start = time.perf_counter()
+        self.blockfield_view.redraw(self.canvas, blockfield, 0)
+        self.render_seconds += time.perf_counter() - start
+
+    def render(self):
+        start = time.perf_counter()
+        for block_view in self.block_views:
+            block_view.redraw(self.canvas, 0)
+        self.render_seconds += time.perf_counter() - start
+
+def bench_render(frames, use_tk):
+    """Renderer cost of one frame per logic step of a seeded game.
+
+    The game is played by a depth-1 AutoPlayer; only the drawing is timed.
+    """
+    if use_tk:
+        root = tetris.Tk()
+        canvas = tetris.Canvas(root, width=MAXCOL * tetris.GRID_SIZE, height=tetris.CANVAS_HEIGHT)
+        canvas.pack()
+    else:
+        canvas = MockCanvas()
+    controller = RenderController(canvas, SEEDS[0])
+    autoplayer = AutoPlayer(controller)
+    autoplayer.configure({"searchDepth": 1})
+    simulator = Simulator(autoplayer=autoplayer, controller=controller)
+    frame_times = []
+    # One frame per logic step, over as many games as it takes
+    while len(frame_times) < frames:
+        for _ in simulator.steps():
+            controller.render()
+            if use_tk:
+                start = time.perf_counter()
+                root.update()
+                controller.render_seconds += time.perf_counter() - start
+            frame_times.append(controller.render_seconds * 1000)
+            controller.render_seconds = 0.0
+            if len(frame_times) == frames:
+                break
+    prefix = "render.tk" if use_tk else "render.mock"
+    results = {
+        prefix + ".frame_ms": result(statistics.mean(frame_times), "ms", "lower"),
+        prefix + ".frame_ms_p95": result(percentile(frame_times, 0.95), "ms", "lower"),
+    }
+    if use_tk:
+        root.destroy()
+    else:
+        results[prefix + ".canvas_ops_per_frame"] = result(canvas.total_ops() / frames, "ops/frame", "lower")
+    return results
+
+def run(quick=False, use_tk=False):
+    repeat = 3 if quick else 7
+    boards = load_boards()
+    results = {}
+    results.update(bench_engine(boards, repeat))
+    results.update(bench_clone(boards, repeat))
+    results.update(bench_best_move([board.snapshot() for board in boards], {
+        "best_move.depth1": {"searchDepth": 1},
+        "best_move.default": {},
+    }))
+    results.update(bench_headless(100 if quick else 300))
+    if tetris.numpy is not None:
+        results.update(bench_vector_env(256, 20 if quick else 100))
+    results.update(bench_render(500 if quick else 2000, use_tk))
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": tetris.numpy is not None,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+def mode_mismatches(report, baseline):
+    """The MODE_KEYS on which the report and the baseline differ."""
+    meta = baseline.get("meta", {})
+    return [key for key in MODE_KEYS if key in meta and meta[key] != report["meta"][key]]
+
+def compare(report, baseline, tolerance):
+    """Print each result against the baseline and return the regressions."""
+    regressions = []
+    for name, current in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["value"]:
+            print(f"{name:40} {current['value']:14.4g} {current['unit']:10} (no baseline)")
+            continue
+        ratio = current["value"] / base["value"]
+        worse = ratio < 1 - tolerance if current["better"] == "higher" else ratio > 1 + tolerance
+        print(f"{name:40} {current['value']:14.4g} {current['unit']:10} x{ratio:.2f}{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine, AutoPlayer and renderer against a stored baseline")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="baseline to compare against (default: baseline.json, or baseline-quick.json with --quick)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="relative slowdown allowed before a result counts as a regression")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats and shorter games")
+    parser.add_argument("--tk", action="store_true", help="render to a real Tk canvas (needs a display, e.g. xvfb-run)")
+    args = parser.parse_args(argv)
+    if args.tk and tetris.tkinter is None:
+        parser.error("--tk needs tkinter")
+    if args.baseline is None:
+        args.baseline = QUICK_BASELINE_PATH if args.quick else BASELINE_PATH
+
+    report = run(args.quick, args.tk)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved baseline to {args.baseline}")
+        return 0
+    baseline = {"results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    mismatches = mode_mismatches(report, baseline)
+    if mismatches:
+        details = ", ".join(f"{key}={baseline['meta'][key]} vs {report['meta'][key]}" for key in mismatches)
+        print(f"{args.baseline} was recorded in another mode ({details}); not comparing")
+        return 2
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Batch self-play runner for evaluating AutoPlayer weight sets.
+
+Plays N headless games spread over a process pool, one piece-sequence seed
+per game, and prints per-game results plus aggregates as JSON:
+
+    python selfplay.py --games 64 --weights '{"holesNumWeight": -8}'
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from tetris import AutoPlayer, PIECE_SOURCE, PIECE_SOURCES, Simulator, percentile
+
+METRICS = ["score", "lines", "pieces", "decisions_per_second"]
+
+def make_autoplayer(settings):
+    autoplayer = AutoPlayer()
+    autoplayer.configure(settings)
+    return autoplayer
+
+def play_game(seed, settings, max_pieces, piece_source=PIECE_SOURCE):
+    result = Simulator(seed, make_autoplayer(settings), piece_source).play(max_pieces)
+    result["seed"] = seed
+    return result
+
+def aggregate(results):
+    summary = {}
+    for metric in METRICS:
+        values = [result[metric] for result in results]
+        summary[metric] = {
+            "mean": statistics.mean(values),
+            "median": statistics.median(values),
+            "p95": percentile(values, 0.95),
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+def run(games, seed, settings, max_pieces, workers, piece_source=PIECE_SOURCE):
+    seeds = list(range(seed, seed + games))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(play_game, seeds, [settings] * games, [max_pieces] * games, [piece_source] * games))
+    return {
+        "games": games,
+        "workers": workers,
+        "settings": settings,
+        "max_pieces": max_pieces,
+        "piece_source": piece_source,
+        "summary": aggregate(results),
+        "results": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless AutoPlayer games in parallel and report statistics")
+    parser.add_argument("--games", type=int, default=os.cpu_count(), help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--pieces", type=int, default=None, help="stop each game after this many pieces")
+    parser.add_argument("--piece-source", choices=sorted(PIECE_SOURCES), default=PIECE_SOURCE, help="piece sequence generator")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--weights", default="{}", help="JSON object of AutoPlayer attributes, or @file.json")
+    parser.add_argument("--output", default=None, help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.weights.startswith("@"):
+        with open(args.weights[1:], "r") as f:
+            settings = json.load(f)
+    else:
+        settings = json.loads(args.weights)
+    try:
+        make_autoplayer(settings)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = run(args.games, args.seed, settings, args.pieces, args.workers, args.piece_source)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
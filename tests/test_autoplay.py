@@ -0,0 +1,24 @@
+import pytest
+
+from tetris import AutoPlayer, Simulator
+
+def play(settings, seed=0, pieces=200):
+    autoplayer = AutoPlayer()
+    autoplayer.configure(dict({"searchDepth": 1}, **settings))
+    return Simulator(seed, autoplayer).play(pieces)
+
+@pytest.mark.parametrize("tick_limited", [False, True])
+def test_instant_placement_clears_lines_like_tick_play(tick_limited):
+    ticked = play({"tickLimited": tick_limited})
+    instant = play({"tickLimited": tick_limited, "instantPlacement": True})
+    assert instant["pieces"] == ticked["pieces"] == 200
+    # Tick play never decides for the first block, so the games differ
+    assert instant["lines"] >= 0.8 * ticked["lines"] > 0
+
+@pytest.mark.parametrize("tick_limited", [False, True])
+def test_speculative_decisions_are_predicted_correctly(tick_limited):
+    autoplayer = AutoPlayer()
+    autoplayer.configure({"searchDepth": 1, "tickLimited": tick_limited})
+    result = Simulator(0, autoplayer).play(200)
+    assert autoplayer.speculationMisses == 0
+    assert result["speculation_hits"] == result["decisions"]
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+
+from tetris import HighScoreStore
+
+NOW = datetime(2026, 10, 17, 12, 0, 0)
+
+def make_store(tmp_path):
+    return HighScoreStore(str(tmp_path / "high_scores.json"), debounce=0)
+
+def scores(store, table="all_time"):
+    return [entry["score"] for entry in store.tables[table]]
+
+def test_equal_results_survive_a_restart(tmp_path):
+    store = make_store(tmp_path)
+    store.add(100, NOW)
+    store.add(100, NOW)
+    store.close()
+    store = make_store(tmp_path)
+    assert scores(store) == [100, 100]
+    store.close()
+
+def test_log_entries_already_compacted_are_loaded_once(tmp_path):
+    store = make_store(tmp_path)
+    store.add(100, NOW)
+    store.add(100, NOW)
+    store.close()
+    # A crash between writing the tables and emptying the log.
+    with open(store.path) as f:
+        entries = json.load(f)["all_time"]
+    with open(store.log_path, "w") as f:
+        f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+    store = make_store(tmp_path)
+    assert scores(store) == [100, 100]
+    store.close()
+
+def test_files_without_ids_still_load(tmp_path):
+    path = tmp_path / "high_scores.json"
+    entry = {"score": 100, "date": NOW.strftime(HighScoreStore.DATE_FORMAT)}
+    path.write_text(json.dumps({"daily": [entry], "all_time": [entry, entry]}))
+    store = make_store(tmp_path)
+    assert scores(store) == [100, 100]
+    store.close()
+
+def test_corrupt_files_are_kept_aside(tmp_path):
+    path = tmp_path / "high_scores.json"
+    path.write_text('{"daily": [')
+    entry = {"score": 100, "date": NOW.strftime(HighScoreStore.DATE_FORMAT), "id": "a"}
+    (tmp_path / "high_scores.json.log").write_text(json.dumps(entry) + "\n{\"score\": 2")
+    store = make_store(tmp_path)
+    assert scores(store) == [100]
+    store.close()
+    assert (tmp_path / "high_scores.json.corrupt").read_text() == '{"daily": ['
+    assert (tmp_path / "high_scores.json.log.corrupt").read_text() == '{"score": 2\n'
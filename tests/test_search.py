@@ -0,0 +1,69 @@
+import pytest
+
+from tetris import AutoPlayer, GameSnapshot, MAXCOL, MAXROW, Simulator
+
+class FakeClock:
+    """Advances by ``tick`` seconds every time the search reads it."""
+    def __init__(self, tick):
+        self.tick = tick
+        self.readings = []
+
+    def __call__(self):
+        self.readings.append(len(self.readings) * self.tick)
+        return self.readings[-1]
+
+def make_autoplayer(depth, clock, budget=0.02):
+    autoplayer = AutoPlayer()
+    autoplayer.configure({"searchDepth": depth, "timeBudget": budget})
+    autoplayer.clock = clock
+    return autoplayer
+
+def spawn_snapshots(seed=0, count=20):
+    """GameSnapshots of a seeded depth-1 game, each taken as a block spawns."""
+    simulator = Simulator(seed)
+    simulator.autoplayer.configure({"searchDepth": 1})
+    snapshots = []
+    for landed in simulator.steps():
+        if landed and not simulator.controller.lost:
+            snapshots.append(GameSnapshot(simulator.gamestate))
+            if len(snapshots) == count:
+                break
+    return snapshots
+
+@pytest.mark.parametrize("depth", [1, 2, 3, 4])
+def test_search_stops_at_the_deadline(depth):
+    for snapshot in spawn_snapshots():
+        clock = FakeClock(0.001)
+        autoplayer = make_autoplayer(depth, clock)
+        autoplayer.best_move(snapshot)
+        deadline = clock.readings[0] + autoplayer.timeBudget
+        # The first reading past the deadline ends the search
+        assert len([now for now in clock.readings if now > deadline]) <= 1
+        if depth == 4:
+            assert clock.readings[-1] > deadline
+
+def test_search_keeps_the_last_complete_depth():
+    for snapshot in spawn_snapshots():
+        # Depth 2 fits in the budget, depth 3 runs out of it
+        timed = make_autoplayer(3, FakeClock(0.001)).best_move(snapshot)
+        unlimited = make_autoplayer(2, FakeClock(0)).best_move(snapshot)
+        assert timed == unlimited
+
+def test_column_helpers_read_game_snapshots():
+    simulator = Simulator(0)
+    simulator.play(60)
+    autoplayer = AutoPlayer()
+    gamestate = simulator.gamestate
+    snapshot = GameSnapshot(gamestate)
+    tiles = gamestate.get_tiles()
+    heights = [
+        next((MAXROW - _y for _y in range(MAXROW) if tiles[_y][_x]), 0)
+        for _x in range(MAXCOL)
+    ]
+    for state in (gamestate, snapshot):
+        assert autoplayer.calculate_total_height(state) == heights
+        assert autoplayer.holes(state) == sum(heights) - sum(tile != 0 for row in tiles for tile in row)
+        assert autoplayer.calculate_holes(state) == sum(
+            tiles[_y][_x] != 0 and tiles[_y + 1][_x] == 0
+            for _y in range(MAXROW - 1) for _x in range(MAXCOL)
+        )
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from tetris import (
+    AutoPlayer, BLOCK_SHAPES, BitBlockField, Block, BlockField, MAXCOL,
+    Placement, ROTATIONS, VectorEnv,
+)
+
+BLOCK_TYPES = list(BLOCK_SHAPES)
+
+def field_rows(blockfield):
+    return [sum(1 << _x for _x, tile in enumerate(row) if tile) for row in blockfield.bitmap]
+
+def drop(blockfield, block_type, action):
+    """Play an action with Block and BlockField, as Model.drop_block would.
+
+    Returns (score, lines), or None when the drop ends the game.
+    """
+    (angle, column) = divmod(action, MAXCOL)
+    (xmin, _, xmax, _) = ROTATIONS[block_type][angle].bounding_box
+    block_x = min(column, MAXCOL - 1 - (xmax - xmin)) - xmin
+    block = Block(block_type, block_x, 0, True)
+    if not block.place(blockfield, block_x, angle):
+        return None
+    landed = False
+    while not landed:
+        (landed, score, cleared_rows) = block.drop(blockfield)
+    if block.position[1] == 0:
+        return None
+    return (score, len(cleared_rows))
+
+def test_step_matches_block_and_blockfield():
+    count = 128
+    env = VectorEnv(count, seed=0)
+    fields = [BlockField() for _ in range(count)]
+    rand = random.Random(0)
+    placements = 0
+    for _ in range(200):
+        actions = [rand.randrange(VectorEnv.ACTIONS) for _ in range(count)]
+        pieces = env.pieces.copy()
+        (observation, rewards, done) = env.step(actions)
+        for k in range(count):
+            outcome = drop(fields[k], BLOCK_TYPES[pieces[k]], actions[k])
+            assert done[k] == (outcome is None)
+            if outcome is not None:
+                assert rewards[k] == outcome[0]
+                assert observation.rows[k].tolist() == field_rows(fields[k])
+                placements += 1
+        finished = done.nonzero()[0]
+        env.reset(finished)
+        for k in finished:
+            fields[k] = BlockField()
+    assert placements > 10000
+
+def test_action_scores_match_autoplayer():
+    env = VectorEnv(16, seed=1)
+    autoplayer = AutoPlayer()
+    # The default weights ignore the block height
+    autoplayer.configure({"blockHeightWeight": -2})
+    rand = random.Random(1)
+    checked = 0
+    for _ in range(30):
+        scores = env.action_scores(autoplayer)
+        (_, cleared, valid, rest) = env.afterstates()
+        for k in range(env.count):
+            block_type = BLOCK_TYPES[env.pieces[k]]
+            blockfield = BitBlockField.from_tiles(
+                [["#888" if row >> _x & 1 else 0 for _x in range(MAXCOL)] for row in env.rows[k].tolist()]
+            )
+            oldTiles = blockfield.get_copy_of_tiles()
+            for action in range(VectorEnv.ACTIONS):
+                # Line clears compare colours in AutoPlayer, which the
+                # VectorEnv boards do not have.
+                if not valid[k, action] or cleared[k, action]:
+                    continue
+                (angle, column) = divmod(action, MAXCOL)
+                (xmin, _, xmax, _) = ROTATIONS[block_type][angle].bounding_box
+                block_x = min(column, MAXCOL - 1 - (xmax - xmin)) - xmin
+                placement = Placement(block_x, angle, block_x, int(rest[k, action]), angle)
+                (record, completedLines, blockRows) = autoplayer.apply_placement(blockfield, oldTiles, block_type, placement)
+                expected = autoplayer.placement_score(autoplayer.board_score(blockfield), completedLines, blockRows)
+                blockfield.undo(record)
+                assert scores[k, action] == pytest.approx(expected)
+                checked += 1
+        # Mostly greedy, so the boards get line clears and some height
+        actions = [
+            action if rand.random() < 0.8 else rand.randrange(VectorEnv.ACTIONS)
+            for action in env.greedy_actions(autoplayer).tolist()
+        ]
+        (_, _, done) = env.step(actions)
+        env.reset(done.nonzero()[0])
+    assert checked > 1000
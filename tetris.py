@@ -1,11 +1,28 @@
-import tkinter
-from tkinter import font, Canvas, Tk, LEFT, BOTH, TRUE
 import time
-from copy import deepcopy, copy
+import math
+from copy import copy
+from collections import namedtuple, OrderedDict, deque
 from enum import Enum
+from abc import ABC, abstractmethod
 import random
 import json
+import os
+import sys
+import heapq
+import uuid
+import threading
 from datetime import datetime, timedelta
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+try:
+    import tkinter
+    from tkinter import font, Canvas, Tk, LEFT, BOTH, TRUE
+except ImportError:  # display-less installs can still use the Simulator
+    tkinter = None
+try:
+    import numpy
+except ImportError:  # AutoPlayer falls back to the pure-Python evaluation
+    numpy = None
 
 # Settings
 DEFAULT_AUTOPLAY = True
@@ -14,6 +31,16 @@ GRID_SIZE = 30
 MAXROW = 20
 MAXCOL = 10
 CANVAS_HEIGHT = GRID_SIZE * (4 + MAXROW)
+TARGET_FPS = 60
+MAX_CATCHUP_STEPS = 10  # logic steps run per tick before the backlog is dropped
+BACKGROUND_FPS = 15  # render rate while the window does not have focus
+BACKGROUND_SPEED = 0.25  # game speed while the window does not have focus; 0 pauses it
+HIDDEN_SPEED = 0.25  # game speed while the window is hidden; 0 pauses it
+HIDDEN_POLL = 0.25  # seconds between ticks while the game is paused
+PIECE_SOURCE = "uniform"  # piece sequence: "uniform", "bag" (7-bag) or "hashed"
+INSTANT_PLACEMENT = False  # autoplay drops each block as soon as it is decided
+DROP_ANIMATION_TIME = 0.12  # seconds an instant drop slides down on screen; 0 jumps
+AI_WORKER = "thread"  # where the AutoPlayer searches: None, "thread" or "process"
 TOP_OFFSET = GRID_SIZE * 6  # Game area moved lower
 
 class Direction(Enum):
@@ -21,12 +48,101 @@ class Direction(Enum):
     RIGHT = 1
 
 # Model Classes
+# Tetromino bitmaps at angle 0 and their colours, indexed by block type.
+BLOCK_SHAPES = {
+    "I": (((0, 0, 0, 0), (1, 1, 1, 1), (0, 0, 0, 0), (0, 0, 0, 0)), "cyan"),
+    "J": (((1, 0, 0), (1, 1, 1), (0, 0, 0)), "blue"),
+    "L": (((0, 0, 1), (1, 1, 1), (0, 0, 0)), "orange"),
+    "O": (((0, 0, 0, 0), (0, 1, 1, 0), (0, 1, 1, 0), (0, 0, 0, 0)), "yellow"),
+    "S": (((0, 1, 1), (1, 1, 0), (0, 0, 0)), "green"),
+    "T": (((0, 1, 0), (1, 1, 1), (0, 0, 0)), "purple"),
+    "Z": (((1, 1, 0), (0, 1, 1), (0, 0, 0)), "red"),
+}
+
+# One immutable entry per block type and angle.  ``row_masks[y]`` has bit x
+# set for each occupied tile, ``column_tops``/``column_bottoms`` give the
+# highest and lowest occupied row of every column from xmin to xmax.
+BlockRotation = namedtuple(
+    "BlockRotation",
+    ["rows", "cells", "bounding_box", "row_masks", "column_tops", "column_bottoms"],
+)
+
+def rotate_rows(rows, direction):
+    size = len(rows)
+    newrows = [[0] * size for _ in range(size)]
+    if direction == Direction.RIGHT:
+        for _y in range(size):
+            for _x in range(size):
+                newrows[_x][size - 1 - _y] = rows[_y][_x]
+    else:
+        for _y in range(size):
+            for _x in range(size):
+                newrows[size - 1 - _x][_y] = rows[_y][_x]
+    return tuple(tuple(row) for row in newrows)
+
+def build_rotation(rows):
+    cells = tuple((_x, _y) for _y, row in enumerate(rows) for _x, tile in enumerate(row) if tile == 1)
+    xs = [_x for (_x, _) in cells]
+    ys = [_y for (_, _y) in cells]
+    (xmin, xmax) = (min(xs), max(xs))
+    row_masks = tuple(sum(1 << _x for _x, tile in enumerate(row) if tile == 1) for row in rows)
+    column_tops = tuple(min(_y for (_x, _y) in cells if _x == column) for column in range(xmin, xmax + 1))
+    column_bottoms = tuple(max(_y for (_x, _y) in cells if _x == column) for column in range(xmin, xmax + 1))
+    return BlockRotation(rows, cells, (xmin, min(ys), xmax, max(ys)), row_masks, column_tops, column_bottoms)
+
+def build_rotation_table():
+    table = {}
+    for block_type, (rows, _) in BLOCK_SHAPES.items():
+        rotations = []
+        for _ in range(4):
+            rotations.append(build_rotation(rows))
+            rows = rotate_rows(rows, Direction.RIGHT)
+        table[block_type] = tuple(rotations)
+    return table
+
+ROTATIONS = build_rotation_table()
+
+def build_distinct_angles(table):
+    # Angles whose occupied cells differ once shifted to the bounding box
+    # origin; e.g. all four O angles land identically.
+    distinct = {}
+    for block_type, rotations in table.items():
+        shapes = []
+        angles = []
+        for angle, rotation in enumerate(rotations):
+            (xmin, ymin, _, _) = rotation.bounding_box
+            shape = tuple((_x - xmin, _y - ymin) for (_x, _y) in rotation.cells)
+            if shape not in shapes:
+                shapes.append(shape)
+                angles.append(angle)
+        distinct[block_type] = tuple(angles)
+    return distinct
+
+DISTINCT_ANGLES = build_distinct_angles(ROTATIONS)
+
 class BlockBitmap:
-    def __init__(self, rows, colour):
-        self.rows = rows
-        self.colour = colour
-        self.size = len(rows)
-        self.calculate_bounding_box()
+    """A block type at one angle; all geometry is looked up in ROTATIONS."""
+    def __init__(self, block_type, angle=0):
+        self.type = block_type
+        self.colour = BLOCK_SHAPES[block_type][1]
+        self.size = len(BLOCK_SHAPES[block_type][0])
+        self.angle = angle
+
+    @property
+    def rotation(self):
+        return ROTATIONS[self.type][self.angle]
+
+    @property
+    def rows(self):
+        return ROTATIONS[self.type][self.angle].rows
+
+    @property
+    def bounding_box(self):
+        return ROTATIONS[self.type][self.angle].bounding_box
+
+    @property
+    def row_masks(self):
+        return ROTATIONS[self.type][self.angle].row_masks
 
     def str(self):
         txt = ""
@@ -37,64 +153,41 @@ class BlockBitmap:
         return txt
 
     def clone(self):
-        rows = [list(row) for row in self.rows]
-        return BlockBitmap(rows, self.colour)
+        return BlockBitmap(self.type, self.angle)
 
     def get_copy_of_tiles(self):
-        return [tuple(row) for row in self.rows]
-
-    def calculate_bounding_box(self):
-        x_min = y_min = self.size
-        x_max = y_max = 0
-        for _y in range(self.size):
-            for _x in range(self.size):
-                if self.rows[_y][_x] == 1:
-                    x_min = min(x_min, _x)
-                    y_min = min(y_min, _y)
-                    x_max = max(x_max, _x)
-                    y_max = max(y_max, _y)
-        self.bounding_box = (x_min, y_min, x_max, y_max)
+        return list(self.rows)
 
     def rotate(self, direction):
-        newrows = [[0] * self.size for _ in range(self.size)]
-        if direction == Direction.RIGHT:
-            for _y in range(self.size):
-                for _x in range(self.size):
-                    newrows[_x][self.size - 1 - _y] = self.rows[_y][_x]
-        else:
-            for _y in range(self.size):
-                for _x in range(self.size):
-                    newrows[self.size - 1 - _x][_y] = self.rows[_y][_x]
-        self.rows = newrows
-        self.calculate_bounding_box()
+        self.angle = (self.angle + direction.value) % 4
 
 class IBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((0, 0, 0, 0), (1, 1, 1, 1), (0, 0, 0, 0), (0, 0, 0, 0)), "cyan")
+        BlockBitmap.__init__(self, "I")
 
 class JBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((1, 0, 0), (1, 1, 1), (0, 0, 0)), "blue")
+        BlockBitmap.__init__(self, "J")
 
 class LBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((0, 0, 1), (1, 1, 1), (0, 0, 0)), "orange")
+        BlockBitmap.__init__(self, "L")
 
 class OBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((0, 0, 0, 0), (0, 1, 1, 0), (0, 1, 1, 0), (0, 0, 0, 0)), "yellow")
+        BlockBitmap.__init__(self, "O")
 
 class SBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((0, 1, 1), (1, 1, 0), (0, 0, 0)), "green")
+        BlockBitmap.__init__(self, "S")
 
 class TBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((0, 1, 0), (1, 1, 1), (0, 0, 0)), "purple")
+        BlockBitmap.__init__(self, "T")
 
 class ZBlock(BlockBitmap):
     def __init__(self):
-        BlockBitmap.__init__(self, ((1, 1, 0), (0, 1, 1), (0, 0, 0)), "red")
+        BlockBitmap.__init__(self, "Z")
 
 class Block:
     def __init__(self, block_type, x, y, falling):
@@ -149,25 +242,37 @@ class Block:
         return True
 
     def rotate(self, blockfield, direction):
-        oldbitmap = self.__bitmap
-        newbitmap = self.__bitmap.clone()
         orig_angle = self.__angle
         orig_x = self.__x
         orig_y = self.__y
         self.__angle = (self.__angle + direction.value) % 4
-        newbitmap.rotate(direction)
-        self.__bitmap = newbitmap
+        self.__bitmap.angle = self.__angle
         (xmin, _, xmax, _) = self.bounding_box
         while self.__x + xmin < 0:
             self.__x += 1
         while self.__x + xmax >= MAXCOL:
             self.__x -= 1
         if blockfield.collision(self, 0, 0):
-            self.__bitmap = oldbitmap
+            self.__bitmap.angle = orig_angle
             self.__x = orig_x
             self.__y = orig_y
             self.__angle = orig_angle
 
+    def place(self, blockfield, x, angle, y=None):
+        """Jump to column x (and row y) at the given angle, if the block fits there."""
+        y = self.__y if y is None else y
+        (xmin, ymin, xmax, ymax) = ROTATIONS[self.__type][angle].bounding_box
+        if x + xmin < 0 or x + xmax >= MAXCOL or y + ymin < 0 or y + ymax >= MAXROW:
+            return False
+        (orig_x, orig_y, orig_angle) = (self.__x, self.__y, self.__angle)
+        (self.__x, self.__y) = (x, y)
+        self.__angle = self.__bitmap.angle = angle
+        if blockfield.collision(self, 0, 0):
+            (self.__x, self.__y) = (orig_x, orig_y)
+            self.__angle = self.__bitmap.angle = orig_angle
+            return False
+        return True
+
     def drop(self, blockfield):
         (_, block_y) = self.position
         (_, _, _, ymax) = self.bounding_box
@@ -180,14 +285,67 @@ class Block:
     def get_copy_of_tiles(self):
         return self.__bitmap.get_copy_of_tiles()
 
+    def clone(self):
+        block = Block(self.__type, self.__x, self.__y, self.__falling)
+        block.__angle = self.__angle
+        block.__bitmap.angle = self.__angle
+        return block
+
 class BlockField:
+    """The game's tile grid, with per-column and per-row indexes.
+
+    Besides the tiles it keeps each column's height, its hole count (empty
+    tiles below the column's top), its overhangs (filled tiles directly
+    above an empty one) and each row's fill count.  ``land`` updates them
+    per block tile and ``drop_row`` per column, so full rows are found by
+    their fill count and the AutoPlayer's height and hole features are
+    O(MAXCOL) reads.
+    """
     def __init__(self):
         self.__tiles = [[0] * MAXCOL for _ in range(MAXROW)]
+        self.__heights = [0] * MAXCOL
+        self.__holes = [0] * MAXCOL
+        self.__overhangs = [0] * MAXCOL
+        self.__fills = [0] * MAXROW
+
+    @classmethod
+    def from_tiles(cls, tiles):
+        blockfield = cls()
+        for _y, row in enumerate(tiles):
+            for _x, tile in enumerate(row):
+                if tile != 0:
+                    blockfield.__fill(_x, _y, tile)
+        return blockfield
+
+    def clone(self):
+        blockfield = BlockField()
+        blockfield.__tiles = [list(row) for row in self.__tiles]
+        blockfield.__heights = list(self.__heights)
+        blockfield.__holes = list(self.__holes)
+        blockfield.__overhangs = list(self.__overhangs)
+        blockfield.__fills = list(self.__fills)
+        return blockfield
 
     @property
     def bitmap(self):
         return self.__tiles
 
+    @property
+    def column_heights(self):
+        return tuple(self.__heights)
+
+    @property
+    def column_holes(self):
+        return tuple(self.__holes)
+
+    @property
+    def column_overhangs(self):
+        return tuple(self.__overhangs)
+
+    @property
+    def row_fills(self):
+        return tuple(self.__fills)
+
     def get_copy_of_tiles(self):
         return [tuple(row) for row in self.__tiles]
 
@@ -203,42 +361,554 @@ class BlockField:
                     return True
         return False
 
+    def __fill(self, _x, _y, colour):
+        tiles = self.__tiles
+        if _y > 0 and tiles[_y - 1][_x] != 0:
+            self.__overhangs[_x] -= 1
+        if _y < MAXROW - 1 and tiles[_y + 1][_x] == 0:
+            self.__overhangs[_x] += 1
+        tiles[_y][_x] = colour
+        self.__fills[_y] += 1
+        top = MAXROW - self.__heights[_x]
+        if _y < top:
+            # The tiles between the new top and the old one become holes
+            self.__holes[_x] += top - _y - 1
+            self.__heights[_x] = MAXROW - _y
+        else:
+            self.__holes[_x] -= 1
+
     def land(self, block):
         (block_x, block_y) = block.position
-        bitmap = block.bitmap.rows
-        (xmin, ymin, xmax, ymax) = block.bounding_box
-        for _y in range(ymin, ymax + 1):
-            for _x in range(xmin, xmax + 1):
-                if bitmap[_y][_x] != 0:
-                    self.__tiles[block_y + _y][block_x + _x] = block.colour
+        for (_x, _y) in block.bitmap.rotation.cells:
+            self.__fill(block_x + _x, block_y + _y, block.colour)
         return self.check_full_rows()
 
     def drop_row(self, row_to_drop):
+        tiles = self.__tiles
+        for _x in range(MAXCOL):
+            filled = tiles[row_to_drop][_x] != 0
+            above = row_to_drop > 0 and tiles[row_to_drop - 1][_x] != 0
+            below_empty = row_to_drop < MAXROW - 1 and tiles[row_to_drop + 1][_x] == 0
+            self.__overhangs[_x] += (above and below_empty) - (above and not filled) - (filled and below_empty)
+            top = MAXROW - self.__heights[_x]
+            if top < row_to_drop:
+                self.__heights[_x] -= 1
+                if not filled:
+                    self.__holes[_x] -= 1
+            elif top == row_to_drop:
+                # The column's top tile goes; its new top is the next
+                # filled tile below, and the holes above that go with it.
+                _y = row_to_drop + 1
+                while _y < MAXROW and tiles[_y][_x] == 0:
+                    _y += 1
+                self.__holes[_x] -= _y - row_to_drop - 1
+                self.__heights[_x] = MAXROW - _y
         for _y in range(row_to_drop, 0, -1):
-            self.__tiles[_y] = self.__tiles[_y - 1]
-        self.__tiles[0] = [0] * MAXCOL
+            tiles[_y] = tiles[_y - 1]
+            self.__fills[_y] = self.__fills[_y - 1]
+        tiles[0] = [0] * MAXCOL
+        self.__fills[0] = 0
 
     def check_full_rows(self):
         scores = [0, 100, 400, 800, 1600]
-        rows_dropped = 0
-        cleared_rows = []
-        for _y in range(MAXROW):
-            if all(self.__tiles[_y][_x] != 0 for _x in range(MAXCOL)):
-                cleared_rows.append(_y)
-                rows_dropped += 1
+        cleared_rows = [_y for _y in range(MAXROW) if self.__fills[_y] == MAXCOL]
         for row in cleared_rows:
             self.drop_row(row)
-        return scores[rows_dropped], cleared_rows
+        return scores[len(cleared_rows)], cleared_rows
+
+# Random 64-bit key per tile; a field's Zobrist hash is the XOR of the keys
+# of its occupied tiles.  Seeded so hashes are stable between runs.
+def build_zobrist_keys(seed):
+    rand = random.Random(seed)
+    return tuple(tuple(rand.getrandbits(64) for _x in range(MAXCOL)) for _y in range(MAXROW))
+
+ZOBRIST_KEYS = build_zobrist_keys(42)
+
+class BitBlockField:
+    """Bitboard variant of BlockField used by the autoplay search.
+
+    Each row is an integer with bit x set when column x is occupied, so a
+    collision test is one shift-and-AND per block row and a full row is a
+    single compare.  Colours live in a separate layer that is only needed
+    for rendering and for ``get_copy_of_tiles``.
+    """
+    FULL_ROW = (1 << MAXCOL) - 1
+
+    def __init__(self, rows=None, colours=None):
+        self.__rows = rows if rows is not None else [0] * MAXROW
+        self.__colours = colours if colours is not None else [[0] * MAXCOL for _ in range(MAXROW)]
+        self.__zobrist = self.calculate_zobrist()
+
+    @classmethod
+    def from_tiles(cls, tiles):
+        rows = []
+        colours = []
+        for row in tiles:
+            bits = 0
+            for _x, tile in enumerate(row):
+                if tile != 0:
+                    bits |= 1 << _x
+            rows.append(bits)
+            colours.append(list(row))
+        return cls(rows, colours)
 
-class Model:
+    @property
+    def bitmap(self):
+        return self.__colours
+
+    @property
+    def rows(self):
+        return self.__rows
+
+    @property
+    def zobrist(self):
+        """Hash of the occupied tiles, kept up to date by every change."""
+        return self.__zobrist
+
+    def calculate_zobrist(self):
+        zobrist = 0
+        for _y, row in enumerate(self.__rows):
+            keys = ZOBRIST_KEYS[_y]
+            for _x in MASK_COLUMNS[row]:
+                zobrist ^= keys[_x]
+        return zobrist
+
+    def get_copy_of_tiles(self):
+        return [tuple(row) for row in self.__colours]
+
+    def clone(self):
+        return BitBlockField(list(self.__rows), [list(row) for row in self.__colours])
+
+    def column_tops(self):
+        """Return the topmost occupied row of each column (MAXROW if empty)."""
+        tops = [MAXROW] * MAXCOL
+        seen = 0
+        for _y, row in enumerate(self.__rows):
+            new = row & ~seen
+            if new:
+                for _x in range(MAXCOL):
+                    if new >> _x & 1:
+                        tops[_x] = _y
+                seen |= row
+                if seen == self.FULL_ROW:
+                    break
+        return tops
+
+    # The BlockField indexes, computed from the bitboard rather than kept
+    # up to date: the search reads them through extract_features instead.
+    @property
+    def column_heights(self):
+        return tuple(MAXROW - top for top in self.column_tops())
+
+    @property
+    def column_holes(self):
+        filled = [0] * MAXCOL
+        for row in self.__rows:
+            for _x in MASK_COLUMNS[row]:
+                filled[_x] += 1
+        return tuple(height - count for height, count in zip(self.column_heights, filled))
+
+    @property
+    def column_overhangs(self):
+        overhangs = [0] * MAXCOL
+        for above, row in zip(self.__rows, self.__rows[1:]):
+            for _x in MASK_COLUMNS[above & ~row]:
+                overhangs[_x] += 1
+        return tuple(overhangs)
+
+    @property
+    def row_fills(self):
+        return tuple(POPCOUNT[row] for row in self.__rows)
+
+    def collides(self, rotation, block_x, block_y):
+        (xmin, ymin, xmax, ymax) = rotation.bounding_box
+        if ymax + block_y >= MAXROW or xmax + block_x >= MAXCOL or xmin + block_x < 0:
+            return True
+        masks = rotation.row_masks
+        rows = self.__rows
+        for _y in range(ymin, ymax + 1):
+            mask = masks[_y] << block_x if block_x >= 0 else masks[_y] >> -block_x
+            if rows[block_y + _y] & mask:
+                return True
+        return False
+
+    def collision(self, block, xoffset, yoffset):
+        (block_x, block_y) = block.position
+        return self.collides(block.bitmap.rotation, block_x + xoffset, block_y + yoffset)
+
+    def place(self, rotation, block_x, block_y, colour):
+        (_, ymin, _, ymax) = rotation.bounding_box
+        masks = rotation.row_masks
+        for _y in range(ymin, ymax + 1):
+            self.__rows[block_y + _y] |= masks[_y] << block_x if block_x >= 0 else masks[_y] >> -block_x
+        for (_x, _y) in rotation.cells:
+            self.__colours[block_y + _y][block_x + _x] = colour
+            self.__zobrist ^= ZOBRIST_KEYS[block_y + _y][block_x + _x]
+        return self.check_full_rows()
+
+    def land(self, block):
+        (block_x, block_y) = block.position
+        return self.place(block.bitmap.rotation, block_x, block_y, block.colour)
+
+    def apply(self, rotation, block_x, block_y, colour):
+        """Land a block in place and return (cleared_rows, undo_record).
+
+        Passing the record to ``undo`` restores the field exactly, so the
+        search can try every candidate on one field without copying it.
+        """
+        (_, ymin, _, ymax) = rotation.bounding_box
+        masks = rotation.row_masks
+        rows = self.__rows
+        full = False
+        for _y in range(ymin, ymax + 1):
+            rows[block_y + _y] |= masks[_y] << block_x if block_x >= 0 else masks[_y] >> -block_x
+            full = full or rows[block_y + _y] == self.FULL_ROW
+        for (_x, _y) in rotation.cells:
+            self.__colours[block_y + _y][block_x + _x] = colour
+            self.__zobrist ^= ZOBRIST_KEYS[block_y + _y][block_x + _x]
+        if not full:
+            return [], (rotation, block_x, block_y, None)
+        # check_full_rows builds new lists, so the current ones become the
+        # snapshot to restore without any copying.
+        saved = (self.__rows, self.__colours, self.__zobrist)
+        (_, cleared_rows) = self.check_full_rows()
+        return cleared_rows, (rotation, block_x, block_y, saved)
+
+    def undo(self, record):
+        (rotation, block_x, block_y, saved) = record
+        if saved:
+            (self.__rows, self.__colours, self.__zobrist) = saved
+        (_, ymin, _, ymax) = rotation.bounding_box
+        masks = rotation.row_masks
+        for _y in range(ymin, ymax + 1):
+            self.__rows[block_y + _y] &= ~(masks[_y] << block_x if block_x >= 0 else masks[_y] >> -block_x)
+        for (_x, _y) in rotation.cells:
+            self.__colours[block_y + _y][block_x + _x] = 0
+            self.__zobrist ^= ZOBRIST_KEYS[block_y + _y][block_x + _x]
+
+    def drop_row(self, row_to_drop):
+        self.__rows[1:row_to_drop + 1] = self.__rows[:row_to_drop]
+        self.__rows[0] = 0
+        self.__colours[1:row_to_drop + 1] = self.__colours[:row_to_drop]
+        self.__colours[0] = [0] * MAXCOL
+        self.__zobrist = self.calculate_zobrist()
+
+    def check_full_rows(self):
+        scores = [0, 100, 400, 800, 1600]
+        full = self.FULL_ROW
+        cleared_rows = [_y for _y in range(MAXROW) if self.__rows[_y] == full]
+        if cleared_rows:
+            kept = [_y for _y in range(MAXROW) if self.__rows[_y] != full]
+            padding = len(cleared_rows)
+            self.__rows = [0] * padding + [self.__rows[_y] for _y in kept]
+            self.__colours = [[0] * MAXCOL for _ in range(padding)] + [self.__colours[_y] for _y in kept]
+            self.__zobrist = self.calculate_zobrist()
+        return scores[len(cleared_rows)], cleared_rows
+
+class SearchTimeout(Exception):
+    """Raised inside AutoPlayer.lookahead when the decision budget runs out."""
+
+class TranspositionTable:
+    """Bounded least-recently-used cache of AutoPlayer search results.
+
+    Keys are built from BitBlockField.zobrist and every value is a float
+    score, so an entry costs about 200 bytes and none of them has to be
+    traversed by the garbage collector.  ``hits`` and ``misses`` count
+    lookups so the effect of the cache can be measured.
+    """
+    def __init__(self, capacity=50000):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.capacity:
+            self.__entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.__entries), "capacity": self.capacity}
+
+# A final resting spot for the falling block.  ``position``/``angle`` are
+# the targets handed to AutoPlayer.make_move, ``x``/``y``/``rest_angle`` is
+# where the block actually comes to rest.
+Placement = namedtuple("Placement", ["position", "angle", "x", "y", "rest_angle"])
+
+# What AutoPlayer.best_move returns when the block fits nowhere.
+NO_PLACEMENT = Placement(0, 0, 0, 0, 0)
+
+def direct_placements(blockfield, block_type, block_x, block_y, angle):
+    """List every distinct (rotation, column) the block can be hard-dropped to.
+
+    Each drop height comes straight from the column-height profile, so a
+    candidate costs O(block width) instead of a tick-by-tick simulation.
+    """
+    tops = blockfield.column_tops()
+    placements = []
+    for rest_angle in DISTINCT_ANGLES[block_type]:
+        rotation = ROTATIONS[block_type][rest_angle]
+        (xmin, _, xmax, _) = rotation.bounding_box
+        bottoms = rotation.column_bottoms
+        for _x in range(-xmin, MAXCOL - xmax):
+            if blockfield.collides(rotation, _x, block_y):
+                continue
+            _y = min(tops[_x + xmin + i] - 1 - bottom for i, bottom in enumerate(bottoms))
+            if _y < block_y:
+                # Already below an overhang: fall back to stepping down.
+                _y = block_y
+                while not blockfield.collides(rotation, _x, _y + 1):
+                    _y += 1
+            placements.append(Placement(_x, rest_angle, _x, _y, rest_angle))
+    return placements
+
+def tick_placements(blockfield, block_type, block_x, block_y, angle):
+    """Reproduce the tick-limited reachability of the original search.
+
+    Every (angle, position) target is played out one drop at a time with at
+    most one move and one rotation per tick, exactly like stepping a dummy
+    Model through GameState.update.  Targets that end up in the same spot
+    are reported once, for the first target that reached it.
+    """
+    rotations = ROTATIONS[block_type]
+    placements = []
+    seen = set()
+    for target_angle in range(4):
+        for position in range(-3, 13):
+            (_x, _y, _angle) = (block_x, block_y, angle)
+            while True:
+                rotation = rotations[_angle]
+                (xmin, _, xmax, ymax) = rotation.bounding_box
+                if _y + ymax == MAXROW - 1 or blockfield.collides(rotation, _x, _y + 1):
+                    break
+                _y += 1
+                step = 1 if position > _x else -1 if position < _x else 0
+                if step and 0 <= _x + step + xmin and _x + step + xmax < MAXCOL \
+                        and not blockfield.collides(rotation, _x + step, _y):
+                    _x += step
+                if target_angle == 3 and _angle == 0:
+                    turn = -1
+                elif target_angle > _angle:
+                    turn = 1
+                else:
+                    continue
+                new_angle = (_angle + turn) % 4
+                (xmin, _, xmax, _) = rotations[new_angle].bounding_box
+                new_x = min(max(_x, -xmin), MAXCOL - 1 - xmax)
+                if not blockfield.collides(rotations[new_angle], new_x, _y):
+                    (_x, _angle) = (new_x, new_angle)
+            key = tuple((_x + cx, _y + cy) for (cx, cy) in rotations[_angle].cells)
+            if key not in seen:
+                seen.add(key)
+                placements.append(Placement(position, target_angle, _x, _y, _angle))
+    return placements
+
+# Board heuristics used by AutoPlayer, computed in one pass by
+# extract_features.  ``holes`` counts filled tiles directly above an empty
+# one, ``hole_count`` counts empty tiles below the top of their column.
+BoardFeatures = namedtuple(
+    "BoardFeatures",
+    [
+        "heights", "total_height", "smoothness", "max_height", "min_height",
+        "height_range", "holes", "hole_count", "row_transitions",
+        "column_transitions", "block_height", "completed_lines",
+    ],
+)
+
+POPCOUNT = tuple(bin(mask).count("1") for mask in range(1 << MAXCOL))
+MASK_COLUMNS = tuple(tuple(_x for _x in range(MAXCOL) if mask >> _x & 1) for mask in range(1 << MAXCOL))
+ROW_PAIRS = (1 << (MAXCOL - 1)) - 1
+
+def extract_features(rows, completed_lines=0, block_rows=None):
+    """Compute every AutoPlayer heuristic from bitboard rows in one pass.
+
+    ``block_rows`` is the (top, bottom) row range of the tiles changed by
+    the last landing, as returned by ``changed_rows``.
+    """
+    heights = [0] * MAXCOL
+    seen = filled = holes = row_transitions = column_transitions = 0
+    above = None
+    for _y, row in enumerate(rows):
+        filled += POPCOUNT[row]
+        row_transitions += POPCOUNT[(row ^ (row >> 1)) & ROW_PAIRS]
+        if above is not None:
+            column_transitions += POPCOUNT[above ^ row]
+            holes += POPCOUNT[above & ~row]
+        new = row & ~seen
+        if new:
+            for _x in MASK_COLUMNS[new]:
+                heights[_x] = MAXROW - _y
+            seen |= row
+        above = row
+    total_height = sum(heights)
+    smoothness = 0
+    for _x in range(MAXCOL - 1):
+        smoothness += abs(heights[_x] - heights[_x + 1])
+    max_height = max(heights)
+    min_height = min(heights)
+    block_height = (block_rows[0] + block_rows[1]) / 2 if block_rows else 0
+    return BoardFeatures(
+        tuple(heights), total_height, smoothness, max_height, min_height,
+        max_height - min_height, holes, total_height - filled,
+        row_transitions, column_transitions, block_height, completed_lines,
+    )
+
+# BoardFeatures fields in the order of AutoPlayer.weights().
+SCORED_FEATURES = (
+    "smoothness", "total_height", "completed_lines", "height_range",
+    "max_height", "min_height", "hole_count", "row_transitions",
+    "column_transitions", "block_height",
+)
+
+def extract_features_batch(rows, completed_lines, block_heights):
+    """Vectorised extract_features over a stack of boards.
+
+    ``rows`` is an (N, MAXROW) integer array of bitboard rows.  Returns an
+    (N, len(SCORED_FEATURES)) float array, ready for a dot product with
+    AutoPlayer.weights().
+    """
+    cells = (rows[:, :, None] >> numpy.arange(MAXCOL)) & 1 == 1
+    occupied = cells.any(axis=1)
+    heights = numpy.where(occupied, MAXROW - cells.argmax(axis=1), 0)
+    total_height = heights.sum(axis=1)
+    max_height = heights.max(axis=1)
+    min_height = heights.min(axis=1)
+    smoothness = numpy.abs(numpy.diff(heights, axis=1)).sum(axis=1)
+    hole_count = total_height - cells.sum(axis=(1, 2))
+    row_transitions = (cells[:, :, 1:] != cells[:, :, :-1]).sum(axis=(1, 2))
+    column_transitions = (cells[:, 1:, :] != cells[:, :-1, :]).sum(axis=(1, 2))
+    return numpy.column_stack((
+        smoothness, total_height, completed_lines, max_height - min_height,
+        max_height, min_height, hole_count, row_transitions,
+        column_transitions, block_heights,
+    )).astype(float)
+
+def changed_rows(old_tiles, new_tiles):
+    """Return the (top, bottom) rows where two tile grids differ, or None."""
+    changed = [_y for _y in range(MAXROW) if any(old != new for old, new in zip(old_tiles[_y], new_tiles[_y]))]
+    return (changed[0], changed[-1]) if changed else None
+
+# Model events
+class ModelEvents:
+    """What a Model reports as it plays.  This base sink ignores everything,
+    which is what the search clones of a Model get."""
+    def block_added(self, block):
+        pass
+
+    def block_removed(self, block):
+        pass
+
+    def block_dropped(self, block, start_y, cleared_rows):
+        pass
+
+    def block_landed(self, blockfield, cleared_rows):
+        pass
+
+    def blockfield_reset(self, blockfield):
+        pass
+
+    def score_changed(self, score):
+        pass
+
+    def game_over(self):
+        pass
+
+NULL_EVENTS = ModelEvents()
+
+class ControllerEvents(ModelEvents):
+    """Passes every event straight on to the controller's callbacks."""
+    def __init__(self, controller):
+        self.controller = controller
+
+    def block_added(self, block):
+        self.controller.register_block(block)
+
+    def block_removed(self, block):
+        self.controller.unregister_block(block)
+
+    def block_dropped(self, block, start_y, cleared_rows):
+        self.controller.block_dropped(block, start_y, cleared_rows)
+
+    def block_landed(self, blockfield, cleared_rows):
+        self.controller.update_blockfield(blockfield)
+
+    def blockfield_reset(self, blockfield):
+        self.controller.update_blockfield(blockfield)
+
+    def score_changed(self, score):
+        self.controller.update_score(score)
+
+    def game_over(self):
+        self.controller.game_over()
+
+class BatchedControllerEvents(ControllerEvents):
+    """Coalesces blockfield and score changes until flush().
+
+    A Model reports the score on every update and the blockfield on every
+    landing; the controller flushes once per rendered frame, so the view
+    sees at most one of each per frame.  Blocks and game over are passed
+    on at once, after anything still pending.
+    """
     def __init__(self, controller):
+        ControllerEvents.__init__(self, controller)
+        self.__blockfield = None
+        self.__score = None
+
+    def block_landed(self, blockfield, cleared_rows):
+        self.__blockfield = blockfield
+
+    def blockfield_reset(self, blockfield):
+        self.__blockfield = blockfield
+
+    def score_changed(self, score):
+        self.__score = score
+
+    def game_over(self):
+        self.flush()
+        self.controller.game_over()
+
+    def flush(self):
+        if self.__blockfield is not None:
+            (blockfield, self.__blockfield) = (self.__blockfield, None)
+            self.controller.update_blockfield(blockfield)
+        if self.__score is not None:
+            (score, self.__score) = (self.__score, None)
+            self.controller.update_score(score)
+
+class Model:
+    def __init__(self, controller, realtime=True, events=None):
         self.__controller = controller
+        # Defaults to calling the controller back directly; clones made for
+        # the AI search get NULL_EVENTS in copy_in_state.
+        self.__events = events if events is not None else ControllerEvents(controller)
+        self.__pieces = None
+        # A realtime model drops the falling block every __move_time
+        # seconds; otherwise it drops on every update, like a dummy model.
+        self.__realtime = realtime
         self.blocktypes = ["I", "J", "L", "O", "S", "T", "Z"]
         self.__falling_block = None
         self.__is_dummy = False
         self.__blockfield = None
         self.__next_block = None
         self.__score = 0
+        self.__lines = 0
+        self.__landings = 0
         self.__last_drop = 0
         self.__moves = 0
         self.__rotates = 0
@@ -251,16 +921,28 @@ class Model:
 
     def clone(self, is_dummy):
         newmodel = copy(self)
+        # Dummy models only exist for the autoplay search, so they get the
+        # cheaper bitboard engine; real clones keep a plain BlockField.
+        if is_dummy and self.__blockfield:
+            blockfield = BitBlockField.from_tiles(self.__blockfield.bitmap)
+        else:
+            blockfield = self.__blockfield.clone() if self.__blockfield else None
         newmodel.copy_in_state(
             is_dummy,
-            deepcopy(self.__blockfield),
-            deepcopy(self.__falling_block),
-            deepcopy(self.__next_block),
+            blockfield,
+            self.__falling_block.clone() if self.__falling_block else None,
+            self.__next_block.clone() if self.__next_block else None,
         )
         return newmodel
 
     def copy_in_state(self, is_dummy, blockfield, falling_block, next_block):
         self.__is_dummy = is_dummy
+        if is_dummy:
+            self.__events = NULL_EVENTS
+            # Draw the same upcoming pieces as the real game, from a copy
+            # made when the first one is needed, instead of taking them from
+            # the controller.
+            self.__pieces = None
         self.__blockfield = blockfield
         self.__falling_block = falling_block
         self.__next_block = next_block
@@ -294,16 +976,38 @@ class Model:
     def get_copy_of_tiles(self):
         return self.__blockfield.get_copy_of_tiles() if self.__blockfield else []
 
+    @property
+    def column_heights(self):
+        return self.__blockfield.column_heights if self.__blockfield else (0,) * MAXCOL
+
+    @property
+    def column_holes(self):
+        return self.__blockfield.column_holes if self.__blockfield else (0,) * MAXCOL
+
+    @property
+    def column_overhangs(self):
+        return self.__blockfield.column_overhangs if self.__blockfield else (0,) * MAXCOL
+
     def init_score(self):
         self.__score = 0
+        self.__lines = 0
+        self.__landings = 0
         self.__score_added = False
-        if not self.__is_dummy:
-            self.__controller.update_score(0)
+        self.__events.score_changed(0)
 
     @property
     def score(self):
         return self.__score
 
+    @property
+    def lines(self):
+        return self.__lines
+
+    @property
+    def landings(self):
+        """Blocks landed since the last restart, including a losing one."""
+        return self.__landings
+
     @property
     def is_dummy(self):
         return self.__is_dummy
@@ -311,42 +1015,45 @@ class Model:
     def __create_new_block(self, falling):
         block_x = MAXCOL // 2 - 2
         block_y = 0
-        blocknum = self.__controller.get_random_blocknum()
+        if self.__is_dummy and self.__pieces is None:
+            pieces = getattr(self.__controller, "pieces", None)
+            self.__pieces = pieces.clone() if pieces else False
+        if self.__pieces:
+            blocknum = next(self.__pieces)
+        else:
+            blocknum = self.__controller.get_random_blocknum()
         blocktype = self.blocktypes[blocknum]
         return Block(blocktype, block_x, block_y, falling)
 
     def __check_falling_block(self, now):
         if not self.__falling_block:
             return False, False
-        if (now - self.__last_drop > self.__move_time) or self.__is_dummy:
+        if (now - self.__last_drop > self.__move_time) or self.__is_dummy or not self.__realtime:
             self.__score += 1
             (landed, scorechange, cleared_rows) = self.__falling_block.drop(self.__blockfield)
             self.__last_drop = now
             if landed:
+                self.__landings += 1
                 (_, block_y) = self.__falling_block.position
                 if block_y == 0:
                     self.__game_over()
                 else:
                     self.__score += scorechange
-                    if cleared_rows:
-                        self.__controller.update_blockfield(self.__blockfield)
-                    if not self.__is_dummy:
-                        self.__controller.update_score(self.__score)
+                    self.__lines += len(cleared_rows)
+                    self.__events.block_landed(self.__blockfield, cleared_rows)
+                    self.__events.score_changed(self.__score)
                     self.__start_next_block()
             return True, landed
         return False, False
 
     def __start_next_block(self):
-        if not self.__is_dummy and self.__falling_block:
-            self.__controller.unregister_block(self.__falling_block)
+        if self.__falling_block:
+            self.__events.block_removed(self.__falling_block)
         self.__falling_block = self.__next_block
         if self.__falling_block:
             self.__falling_block.fall()
         self.__next_block = self.__create_new_block(False)
-        if not self.__is_dummy:
-            self.__controller.register_block(self.__next_block)
-            self.__controller.update_blockfield(self.__blockfield)
-            self.__controller.update_score(self.__score)
+        self.__events.block_added(self.__next_block)
 
     def move(self, direction):
         if not self.__falling_block:
@@ -370,40 +1077,54 @@ class Model:
         self.__moves = 0
         self.__rotates = 0
 
-    def drop_block(self):
+    def place_falling_block(self, x, angle, y=None):
+        """Move the falling block straight to column x (and row y) and angle, if it fits."""
         if not self.__falling_block:
-            return
+            return False
+        return self.__falling_block.place(self.__blockfield, x, angle, y)
+
+    def drop_block(self, start_y=None):
+        """Hard-drop the falling block; False if there was none or the game ended.
+
+        ``start_y`` is the row the drop is reported to start from, for a
+        block that was placed lower than it was falling.
+        """
+        if not self.__falling_block:
+            return False
+        if start_y is None:
+            (_, start_y) = self.__falling_block.position
         landed = False
         while not landed:
             (landed, scorechange, cleared_rows) = self.__falling_block.drop(self.__blockfield)
+        self.__landings += 1
         (_, block_y) = self.__falling_block.position
         if block_y == 0:
             self.__game_over()
-        else:
-            self.__score += scorechange
-            if cleared_rows:
-                self.__controller.update_blockfield(self.__blockfield)
-            if not self.__is_dummy:
-                self.__controller.update_score(self.__score)
-            self.__start_next_block()
+            return False
+        self.__score += scorechange
+        self.__lines += len(cleared_rows)
+        self.__events.block_dropped(self.__falling_block, start_y, cleared_rows)
+        self.__events.block_landed(self.__blockfield, cleared_rows)
+        self.__events.score_changed(self.__score)
+        self.__start_next_block()
+        return True
 
     def __game_over(self):
-        if not self.__is_dummy:
-            self.__controller.game_over()
+        self.__events.game_over()
 
     def restart(self):
         self.init_score()
         if self.__falling_block:
-            self.__controller.unregister_block(self.__falling_block)
+            self.__events.block_removed(self.__falling_block)
         if self.__next_block:
-            self.__controller.unregister_block(self.__next_block)
+            self.__events.block_removed(self.__next_block)
         self.__next_block = self.__create_new_block(False)
         self.__falling_block = self.__create_new_block(True)
-        self.__controller.register_block(self.__falling_block)
-        self.__controller.register_block(self.__next_block)
+        self.__events.block_added(self.__falling_block)
+        self.__events.block_added(self.__next_block)
         self.__last_drop = 0.0
         self.__blockfield = BlockField()
-        self.__controller.update_blockfield(self.__blockfield)
+        self.__events.blockfield_reset(self.__blockfield)
         self.__autoplay = False
         self.__move_time = 0.5
         self.reset_counts()
@@ -412,78 +1133,136 @@ class Model:
         self.__autoplay = state
         self.__move_time = 0.01 if state else 0.5
 
+    @property
+    def move_time(self):
+        return self.__move_time
+
     def update(self):
-        now = time.time()
+        now = time.time() if self.__realtime else 0
         self.reset_counts()
-        if not self.__is_dummy:
-            self.__controller.update_score(self.__score)
+        self.__events.score_changed(self.__score)
         return self.__check_falling_block(now)
 
 # View Classes
+def tile_rectangle(x, y, left_offset):
+    tile_y = TOP_OFFSET + GRID_SIZE * y
+    tile_x = left_offset + GRID_SIZE * x
+    # Leave a one pixel gap so the tile borders stay visible
+    return (tile_x + 1, tile_y + 1, tile_x + GRID_SIZE - 1, tile_y + GRID_SIZE - 1)
+
 class TileView:
     def __init__(self, canvas, x, y, colour, left_offset):
-        tile_y = TOP_OFFSET + GRID_SIZE * y
-        tile_x = left_offset + GRID_SIZE * x
         # Add a slight border to tiles for better visibility
         self.__rect = canvas.create_rectangle(
-            tile_x + 1, tile_y + 1, 
-            tile_x + GRID_SIZE - 1, tile_y + GRID_SIZE - 1, 
+            *tile_rectangle(x, y, left_offset),
             fill=colour, outline="#222", width=1
         )
         self.__y = y
 
+    def move_to(self, canvas, x, y, left_offset):
+        canvas.coords(self.__rect, *tile_rectangle(x, y, left_offset))
+        self.__y = y
+
     def erase(self, canvas):
         canvas.delete(self.__rect)
 
 class BlockView:
+    """Retained-mode view of a block.
+
+    The tile items are created once; later redraws only move them, and only
+    when the block's position, angle or falling state has changed.
+    """
     def __init__(self, block):
         self.__block = block
         self.__tiles = []
+        self.__drawn_state = None
 
     @property
     def block(self):
         return self.__block
 
-    def draw(self, canvas, left_offset):
+    def __state(self):
+        return (self.__block.position, self.__block.angle, self.__block.is_falling())
+
+    def __origin(self):
         if self.__block.is_falling():
-            (block_x, block_y) = self.__block.position
-        else:
-            block_x, block_y = -5, 5
-        bitmap = self.__block.bitmap
-        self.__tiles = []
-        _y = block_y
-        for row in bitmap.rows:
-            _x = block_x
-            for tile in row:
-                if tile == 1:
-                    tileview = TileView(canvas, _x, _y, self.__block.colour, left_offset)
-                    self.__tiles.append(tileview)
-                _x += 1
-            _y += 1
+            return self.__block.position
+        return (-5, 5)
+
+    def draw(self, canvas, left_offset):
+        (block_x, block_y) = self.__origin()
+        colour = self.__block.colour
+        self.__tiles = [
+            TileView(canvas, block_x + _x, block_y + _y, colour, left_offset)
+            for (_x, _y) in self.__block.bitmap.rotation.cells
+        ]
+        self.__drawn_state = self.__state()
 
     def redraw(self, canvas, left_offset):
-        self.erase(canvas)
-        self.draw(canvas, left_offset)
+        state = self.__state()
+        if state == self.__drawn_state:
+            return
+        if not self.__tiles:
+            self.draw(canvas, left_offset)
+            return
+        (block_x, block_y) = self.__origin()
+        for tile, (_x, _y) in zip(self.__tiles, self.__block.bitmap.rotation.cells):
+            tile.move_to(canvas, block_x + _x, block_y + _y, left_offset)
+        self.__drawn_state = state
 
     def erase(self, canvas):
         for tile in self.__tiles:
             tile.erase(canvas)
         self.__tiles.clear()
+        self.__drawn_state = None
 
 class BlockfieldView:
-    def __init__(self):
-        self.__tiles = []
-
-    def redraw(self, canvas, blockfield, left_offset):
-        for tileview in self.__tiles:
-            tileview.erase(canvas)
-        self.__tiles.clear()
-        bitmap = blockfield.bitmap
-        for _y, row in enumerate(bitmap):
+    """Landed tiles, drawn with one persistent canvas item per cell.
+
+    The items are created hidden the first time the field is drawn; after
+    that a redraw only reconfigures the cells whose colour changed.
+    """
+    def __init__(self, canvas=None, left_offset=0):
+        self.__items = None
+        self.__colours = [[0] * MAXCOL for _ in range(MAXROW)]
+        if canvas:
+            self.__create_items(canvas, left_offset)
+
+    def __create_items(self, canvas, left_offset):
+        self.__items = [
+            [
+                canvas.create_rectangle(
+                    *tile_rectangle(_x, _y, left_offset),
+                    fill="", outline="#222", width=1, state="hidden"
+                )
+                for _x in range(MAXCOL)
+            ]
+            for _y in range(MAXROW)
+        ]
+
+    def redraw(self, canvas, blockfield, left_offset, hidden=()):
+        """Show the field; tiles listed in ``hidden`` are drawn empty."""
+        if self.__items is None:
+            self.__create_items(canvas, left_offset)
+        hidden_rows = {_y for (_, _y) in hidden}
+        for _y, row in enumerate(blockfield.bitmap):
+            if _y in hidden_rows:
+                row = [0 if (_x, _y) in hidden else tile for _x, tile in enumerate(row)]
+            shown = self.__colours[_y]
+            if shown == row:
+                continue
+            items = self.__items[_y]
             for _x, tile in enumerate(row):
-                if tile != 0:
-                    tileview = TileView(canvas, _x, _y, tile, left_offset)
-                    self.__tiles.append(tileview)
+                if tile != shown[_x]:
+                    if tile == 0:
+                        canvas.itemconfig(items[_x], state="hidden")
+                    else:
+                        canvas.itemconfig(items[_x], fill=tile, state="normal")
+                    shown[_x] = tile
+
+DropAnimation = namedtuple(
+    "DropAnimation", ["tiles", "cells", "x", "start_y", "end_y", "start", "hidden"]
+)
 
 class View:
     def __init__(self, root, controller):
@@ -511,9 +1290,11 @@ class View:
         self.__init_score()
         self.__init_high_scores()
         self.__block_views = []
-        self.__blockfield_view = BlockfieldView()
+        self.__blockfield_view = BlockfieldView(self.__canvas, self.left_offset)
         self.__messages = []
-        self.__high_scores_texts = []
+        self.__overlay = None
+        self.__blockfield = None
+        self.__drop_animation = None
 
     def __init_fonts(self):
         self.bigfont = font.Font(family="Helvetica", size=36, weight="bold")
@@ -521,6 +1302,7 @@ class View:
         self.smallfont = font.Font(family="Helvetica", size=14)
 
     def __init_score(self):
+        self.__displayed_score = 0
         self.score_text = self.__canvas.create_text(
             self.screen_width // 2, self.top_offset // 2,
             anchor="center", 
@@ -550,9 +1332,6 @@ class View:
         )
 
     def __init_high_scores(self):
-
-
-        
         # Titles with better styling
         self.daily_title = self.__canvas.create_text(
             self.screen_width // 6, 30, 
@@ -566,48 +1345,71 @@ class View:
             font=self.smallfont, fill="#aaa"
         )
 
-    def display_high_scores(self, high_scores):
-        for txt in self.__high_scores_texts:
-            self.__canvas.delete(txt)
-        self.__high_scores_texts = []
-
-        y_offset = 60
-        for i, s in enumerate(high_scores.get('daily', [])[:10]):
-            score_text = f"{i+1}. {s['score']}"
-            date_text = f"{s['date']}"
-            
+        # Persistent [score item, date item, score text, date text] rows
+        self.__high_scores_version = None
+        self.__high_score_rows = {
+            "daily": self.__create_high_score_rows(
+                self.screen_width // 6 - 100, self.screen_width // 6 + 100
+            ),
+            "all_time": self.__create_high_score_rows(
+                self.screen_width - self.screen_width // 3 + 20,
+                self.screen_width - self.screen_width // 3 + 200
+            ),
+        }
+
+    def __create_high_score_rows(self, score_x, date_x):
+        rows = []
+        for i in range(10):
             txt_score = self.__canvas.create_text(
-                self.screen_width // 6 - 100, y_offset + i * 25, 
-                anchor="nw", text=score_text, 
+                score_x, 60 + i * 25,
+                anchor="nw", text="",
                 font=self.smallfont, fill="#ccc"
             )
-            
             txt_date = self.__canvas.create_text(
-                self.screen_width // 6 + 100, y_offset + i * 25, 
-                anchor="nw", text=date_text, 
+                date_x, 60 + i * 25,
+                anchor="nw", text="",
                 font=self.smallfont, fill="#999"
             )
-            
-            self.__high_scores_texts.extend([txt_score, txt_date])
-
-        y_offset = 60
-        for i, s in enumerate(high_scores.get('all_time', [])[:10]):
-            score_text = f"{i+1}. {s['score']}"
-            date_text = f"{s['date']}"
-            
-            txt_score = self.__canvas.create_text(
-                self.screen_width - self.screen_width // 3 + 20, y_offset + i * 25, 
-                anchor="nw", text=score_text, 
-                font=self.smallfont, fill="#ccc"
-            )
-            
-            txt_date = self.__canvas.create_text(
-                self.screen_width - self.screen_width // 3 + 200, y_offset + i * 25, 
-                anchor="nw", text=date_text, 
-                font=self.smallfont, fill="#999"
+            rows.append([txt_score, txt_date, "", ""])
+        return rows
+
+    def display_high_scores(self, high_scores, version=None):
+        # The tables only change at game over, so a caller that versions
+        # them lets every other frame skip this entirely.
+        if version is not None and version == self.__high_scores_version:
+            return
+        self.__high_scores_version = version
+        for table, rows in self.__high_score_rows.items():
+            entries = high_scores.get(table, [])[:10]
+            for i, row in enumerate(rows):
+                if i < len(entries):
+                    score_text = f"{i+1}. {entries[i]['score']}"
+                    date_text = f"{entries[i]['date']}"
+                else:
+                    score_text = date_text = ""
+                if score_text != row[2]:
+                    self.__canvas.itemconfig(row[0], text=score_text)
+                    row[2] = score_text
+                if date_text != row[3]:
+                    self.__canvas.itemconfig(row[1], text=date_text)
+                    row[3] = date_text
+
+    @property
+    def canvas(self):
+        return self.__canvas
+
+    @property
+    def blockfield_view(self):
+        return self.__blockfield_view
+
+    def show_overlay(self, text):
+        if self.__overlay is None:
+            self.__overlay = self.__canvas.create_text(
+                10, 10, anchor="nw", text=text,
+                font=self.smallfont, fill="#6c6"
             )
-            
-            self.__high_scores_texts.extend([txt_score, txt_date])
+        else:
+            self.__canvas.itemconfig(self.__overlay, text=text)
 
     def register_block(self, block):
         self.__block_views.append(BlockView(block))
@@ -619,9 +1421,63 @@ class View:
                 self.__block_views.remove(block_view)
 
     def update_blockfield(self, blockfield):
-        self.__blockfield_view.redraw(self.__canvas, blockfield, self.left_offset)
+        self.__blockfield = blockfield
+        hidden = self.__drop_animation.hidden if self.__drop_animation else ()
+        self.__blockfield_view.redraw(self.__canvas, blockfield, self.left_offset, hidden)
+
+    @property
+    def animating(self):
+        """True while an instant drop is still sliding down.
+
+        Measured by the clock rather than by frames drawn, so a game whose
+        window is hidden mid-slide does not wait for the next frame.
+        """
+        animation = self.__drop_animation
+        return animation is not None and time.perf_counter() - animation.start < DROP_ANIMATION_TIME
+
+    def animate_drop(self, block, start_y, cleared_rows):
+        """Slide a hard-dropped block down from start_y over DROP_ANIMATION_TIME.
+
+        The landed tiles stay hidden in the field until the slide ends,
+        unless the landing cleared rows and moved them.
+        """
+        self.__finish_drop_animation()
+        (block_x, block_y) = block.position
+        cells = block.bitmap.rotation.cells
+        tiles = [
+            TileView(self.__canvas, block_x + _x, start_y + _y, block.colour, self.left_offset)
+            for (_x, _y) in cells
+        ]
+        hidden = () if cleared_rows else {(block_x + _x, block_y + _y) for (_x, _y) in cells}
+        self.__drop_animation = DropAnimation(
+            tiles, cells, block_x, start_y, block_y, time.perf_counter(), hidden
+        )
+
+    def __step_drop_animation(self):
+        animation = self.__drop_animation
+        progress = (time.perf_counter() - animation.start) / DROP_ANIMATION_TIME
+        if progress >= 1:
+            self.__finish_drop_animation()
+            return
+        # Ease out, so the block lands softly
+        offset = (animation.end_y - animation.start_y) * (1 - (1 - progress) ** 2)
+        for tile, (_x, _y) in zip(animation.tiles, animation.cells):
+            tile.move_to(self.__canvas, animation.x + _x, animation.start_y + offset + _y, self.left_offset)
+
+    def __finish_drop_animation(self):
+        animation = self.__drop_animation
+        if animation is None:
+            return
+        self.__drop_animation = None
+        for tile in animation.tiles:
+            tile.erase(self.__canvas)
+        if animation.hidden and self.__blockfield is not None:
+            self.__blockfield_view.redraw(self.__canvas, self.__blockfield, self.left_offset)
 
     def display_score(self, score):
+        if score == self.__displayed_score:
+            return
+        self.__displayed_score = score
         self.__canvas.itemconfig(self.score_text, text=f"Skor: {score}")
 
     def game_over(self):
@@ -632,11 +1488,13 @@ class View:
             self.__canvas.delete(txt)
         self.__messages.clear()
 
-    def update(self, score, high_scores):
+    def update(self, score, high_scores, high_scores_version=None):
+        if self.__drop_animation:
+            self.__step_drop_animation()
         for block_view in self.__block_views:
             block_view.redraw(self.__canvas, self.left_offset)
         self.display_score(score)
-        self.display_high_scores(high_scores)
+        self.display_high_scores(high_scores, high_scores_version)
 
 # GameState
 class GameState:
@@ -665,12 +1523,21 @@ class GameState:
     def get_tiles(self):
         return self.__model.get_copy_of_tiles()
 
+    def get_column_heights(self):
+        return self.__model.column_heights
+
+    def get_column_holes(self):
+        return self.__model.column_holes
+
+    def get_column_overhangs(self):
+        return self.__model.column_overhangs
+
     def get_score(self):
         return self.__model.score
 
     def clone(self, is_dummy):
         game = GameState(self.__model.clone(is_dummy))
-        game._set_model(self.__model.clone(is_dummy), True)
+        game.__is_a_clone = True
         return game
 
     def _set_model(self, model, is_a_clone):
@@ -683,14 +1550,30 @@ class GameState:
     def rotate(self, direction):
         self.__model.rotate(direction)
 
+    def place(self, x, angle, y=None):
+        return self.__model.place_falling_block(x, angle, y)
+
+    def drop(self, start_y=None):
+        return self.__model.drop_block(start_y)
+
     def update(self):
         if self.__model.is_dummy:
             return self.__model.update()[1]
         return False
 
 # AutoPlayer
+# AutoPlayer attributes, besides the weights, that configure its search and play.
+SEARCH_SETTINGS = (
+    "tickLimited", "batchEvaluation", "searchDepth", "beamWidth", "timeBudget",
+    "instantPlacement", "speculativeSearch",
+)
+
+# A decision for the next block made before it spawned: the GameSnapshot it
+# was searched on, and the Placement found or a future of it.
+Speculation = namedtuple("Speculation", ["snapshot", "decision"])
+
 class AutoPlayer:
-    def __init__(self, controller):
+    def __init__(self, controller=None):
         self.controller = controller
         self.rand = random.Random()
         self.holesWeight = -8.5
@@ -704,28 +1587,102 @@ class AutoPlayer:
         self.rowMovementWeight = -5.5
         self.columnMovementWeight = -6.5
         self.blockHeightWeight = 0
-        self.bestPosition = 0
-        self.bestAngle = 0
+        # Search only the rotations and columns a hard drop can reach.  Set
+        # to True to reproduce the one-move-per-tick reachability instead.
+        self.tickLimited = False
+        # Score all candidates at once with NumPy when it is installed.
+        self.batchEvaluation = numpy is not None
+        # Lookahead: searchDepth pieces are placed (the falling block, the
+        # known next block, then every possible block type), keeping only
+        # the beamWidth best-scoring placements at each ply.  Deeper plies
+        # are searched iteratively until timeBudget seconds have passed.
+        self.searchDepth = 2
+        self.beamWidth = 5
+        self.timeBudget = 0.1
+        # What timeBudget is measured with; tests swap in a fake clock.
+        self.clock = time.perf_counter
+        # Jump each block straight to its chosen placement and hard-drop it
+        # as soon as the search is done, instead of moving it one step per
+        # tick while it falls.
+        self.instantPlacement = False
+        # While a block falls, search for the next one on the board the
+        # current decision will leave, and use that decision when the next
+        # block spawns if the game turned out as predicted.  An instant
+        # placement leaves no fall to search during, so without a
+        # BackgroundAutoPlayer this does nothing in instant mode.
+        self.speculativeSearch = True
+        self.speculation = None
+        self.speculationHits = 0
+        self.speculationMisses = 0
+        # Board scores and lookahead values keyed by Zobrist hash, kept
+        # across decisions and flushed whenever the search settings change.
+        self.cache = TranspositionTable()
+        self.cacheSettings = None
+        # The Placement chosen for the falling block
+        self.bestPlacement = NO_PLACEMENT
         self.prevY = -1
+        self.decisions = 0
+
+    @property
+    def bestPosition(self):
+        return self.bestPlacement.position
+
+    @property
+    def bestAngle(self):
+        return self.bestPlacement.angle
 
     def next_move(self, gamestate):
         x, y = gamestate.get_falling_block_position()
-        if y < self.prevY:
-            self.bestPosition, self.bestAngle = self.best_move(gamestate)
+        if y < self.prevY or self.instantPlacement:
+            self.bestPlacement = self.take_speculation(gamestate) or self.best_move(gamestate)
+            self.decisions += 1
+        elif self.speculation is None and self.speculativeSearch:
+            # A tick after the decision, so the two searches of a miss
+            # never share a frame.  Never reached in instant mode, where
+            # every call is for a new block.
+            snapshot = self.predict(gamestate)
+            self.speculation = Speculation(snapshot, self.best_move(snapshot) if snapshot else None)
         self.prevY = y
-        self.make_move(gamestate, self.bestPosition, self.bestAngle)
+        self.play_move(gamestate)
+
+    def predict(self, gamestate):
+        """GameSnapshot of the game once the falling block lands as decided.
+
+        None if the decision cannot be placed or the landing ends the game.
+        """
+        placement = self.bestPlacement
+        clone = gamestate.clone(True)
+        if not clone.place(placement.x, placement.rest_angle, placement.y) or not clone.drop():
+            return None
+        return GameSnapshot(clone)
+
+    def take_speculation(self, gamestate):
+        """The speculative decision for this block, if its prediction came true."""
+        (speculation, self.speculation) = (self.speculation, None)
+        if speculation is None or speculation.snapshot is None:
+            return None
+        if not speculation.snapshot.matches(gamestate, self.tickLimited):
+            self.speculationMisses += 1
+            return None
+        self.speculationHits += 1
+        return speculation.decision
+
+    def play_move(self, gamestate):
+        """Head for the current decision, one step per tick or instantly.
+
+        An instant placement puts the block straight into its resting spot:
+        with tickLimited the steering target can lie outside the field.
+        """
+        placement = self.bestPlacement
+        if self.instantPlacement:
+            (_, y) = gamestate.get_falling_block_position()
+            gamestate.place(placement.x, placement.rest_angle, placement.y)
+            gamestate.drop(y)
+        else:
+            self.make_move(gamestate, placement.position, placement.angle)
 
     def calculate_total_height(self, clone):
-        tiles = clone.get_tiles()
-        columnHeights = []
-        for column in range(MAXCOL):
-            for row in range(MAXROW):
-                if tiles[row][column] != 0:
-                    columnHeights.append(MAXROW - row)
-                    break
-                elif row == MAXROW - 1:
-                    columnHeights.append(0)
-        return columnHeights
+        return list(clone.get_column_heights())
 
     def calculate_smoothness(self, heights):
         smoothness = 0
@@ -734,20 +1691,7 @@ class AutoPlayer:
         return smoothness
 
     def holes(self, clone):
-        tiles = clone.get_tiles()
-        numHoles = 0
-        for column in range(MAXCOL):
-            counter = 0
-            gap = False
-            for row in range(MAXROW):
-                if gap:
-                    counter += 1
-                if row < MAXROW - 1 and tiles[row][column] != 0 and tiles[row + 1][column] == 0:
-                    gap = True
-                if row < MAXROW - 1 and tiles[row][column] == 0 and tiles[row + 1][column] != 0:
-                    gap = False
-            numHoles += counter
-        return numHoles
+        return sum(clone.get_column_holes())
 
     def calculate_RowAndColumn_Movement(self, clone):
         tiles = clone.get_tiles()
@@ -763,13 +1707,7 @@ class AutoPlayer:
         return (rowMovement, columnMovement)
 
     def calculate_holes(self, clone):
-        tiles = clone.get_tiles()
-        holes = 0
-        for row in range(MAXROW - 1):
-            for column in range(MAXCOL):
-                if tiles[row][column] != 0 and tiles[row + 1][column] == 0:
-                    holes += 1
-        return holes
+        return sum(clone.get_column_overhangs())
 
     def calculate_completed_lines(self, oldscore, clone):
         newScore = clone.get_score()
@@ -805,71 +1743,1045 @@ class AutoPlayer:
         elif targetAngle > angle:
             gamestate.rotate(Direction.RIGHT)
 
-    def best_move(self, gamestate):
-        bestPosition = bestAngle = 0
-        bestScore = -float('inf')
-        for angle in range(4):
-            for position in range(-3, 13):
-                clone = gamestate.clone(True)
-                oldScore = clone.get_score()
-                oldTiles = clone.get_tiles()
-                while not clone.update():
-                    x, y = clone.get_falling_block_position()
-                    blockAngle = clone.get_falling_block_angle()
-                    if position > x:
-                        clone.move(Direction.RIGHT)
-                    if position < x:
-                        clone.move(Direction.LEFT)
-                    if angle == 3 and blockAngle == 0:
-                        clone.rotate(Direction.LEFT)
-                    elif angle > blockAngle:
-                        clone.rotate(Direction.RIGHT)
-                heights = self.calculate_total_height(clone)
-                totalHeight = sum(heights)
-                smoothness = self.calculate_smoothness(heights)
-                holes = self.calculate_holes(clone)
-                completedLines = self.calculate_completed_lines(oldScore, clone)
-                maxYCanvas = max(heights) if heights else 0
-                minYCanvas = min(heights) if heights else 0
-                rangeCanvas = maxYCanvas - minYCanvas
-                holeNum = self.holes(clone)
-                rowMovement, columnMovement = self.calculate_RowAndColumn_Movement(clone)
-                blockCoor = self.find_block_coordinate(clone, oldTiles, completedLines)
-                blockHeight = (max(c[1] for c in blockCoor) + min(c[1] for c in blockCoor)) / 2 if blockCoor else 0
-                score = (
-                    smoothness * self.smoothnessWeight +
-                    totalHeight * self.totalHeightWeight +
-                    completedLines * self.completedLinesWeight +
-                    rangeCanvas * self.rangeWeight +
-                    maxYCanvas * self.maxYWeight +
-                    minYCanvas * self.minYWeight +
-                    holeNum * self.holesNumWeight +
-                    rowMovement * self.rowMovementWeight +
-                    columnMovement * self.columnMovementWeight +
-                    blockHeight * self.blockHeightWeight
-                )
-                if score > bestScore:
-                    bestScore = score
-                    bestPosition = position
-                    bestAngle = angle
-        return (bestPosition, bestAngle)
+    def generate_placements(self, blockfield, blockType, x, y, angle):
+        generate = tick_placements if self.tickLimited else direct_placements
+        return generate(blockfield, blockType, x, y, angle)
+
+    def placements(self, blockfield, gamestate):
+        blockType = gamestate.get_falling_block_type()
+        if not blockType:
+            return []
+        x, y = gamestate.get_falling_block_position()
+        angle = gamestate.get_falling_block_angle()
+        return self.generate_placements(blockfield, blockType, x, y, angle)
+
+    def weights(self):
+        return (
+            self.smoothnessWeight, self.totalHeightWeight,
+            self.completedLinesWeight, self.rangeWeight, self.maxYWeight,
+            self.minYWeight, self.holesNumWeight, self.rowMovementWeight,
+            self.columnMovementWeight, self.blockHeightWeight,
+        )
+
+    def evaluate(self, features):
+        return (
+            features.smoothness * self.smoothnessWeight +
+            features.total_height * self.totalHeightWeight +
+            features.completed_lines * self.completedLinesWeight +
+            features.height_range * self.rangeWeight +
+            features.max_height * self.maxYWeight +
+            features.min_height * self.minYWeight +
+            features.hole_count * self.holesNumWeight +
+            features.row_transitions * self.rowMovementWeight +
+            features.column_transitions * self.columnMovementWeight +
+            features.block_height * self.blockHeightWeight
+        )
+
+    def apply_placement(self, blockfield, oldTiles, blockType, placement):
+        rotation = ROTATIONS[blockType][placement.rest_angle]
+        (cleared_rows, record) = blockfield.apply(rotation, placement.x, placement.y, BLOCK_SHAPES[blockType][1])
+        # Landing on the top row ends the game, so no lines are scored.
+        completedLines = len(cleared_rows) if placement.y != 0 else 0
+        if cleared_rows:
+            blockRows = changed_rows(oldTiles, blockfield.bitmap)
+        else:
+            (_, ymin, _, ymax) = rotation.bounding_box
+            blockRows = (placement.y + ymin, placement.y + ymax)
+        return (record, completedLines, blockRows)
+
+    def board_score(self, blockfield):
+        """Cached score of the field, without the placement terms."""
+        score = self.cache.get(blockfield.zobrist)
+        if score is None:
+            score = self.evaluate(extract_features(blockfield.rows))
+            self.cache.put(blockfield.zobrist, score)
+        return score
+
+    def placement_score(self, boardScore, completedLines, blockRows):
+        blockHeight = (blockRows[0] + blockRows[1]) / 2 if blockRows else 0
+        return boardScore + completedLines * self.completedLinesWeight + blockHeight * self.blockHeightWeight
+
+    def evaluate_batch(self, blockfield, oldTiles, blockType, placements):
+        scores = [0] * len(placements)
+        missing = []
+        boards = []
+        for index, placement in enumerate(placements):
+            (record, completedLines, blockRows) = self.apply_placement(blockfield, oldTiles, blockType, placement)
+            boardScore = self.cache.get(blockfield.zobrist)
+            if boardScore is None:
+                missing.append((index, blockfield.zobrist))
+                boards.append(list(blockfield.rows))
+                scores[index] = self.placement_score(0, completedLines, blockRows)
+            else:
+                scores[index] = self.placement_score(boardScore, completedLines, blockRows)
+            blockfield.undo(record)
+        if boards:
+            zeros = [0] * len(boards)
+            features = extract_features_batch(numpy.array(boards), zeros, zeros)
+            boardScores = features @ numpy.array(self.weights())
+            for (index, zobrist), boardScore in zip(missing, boardScores.tolist()):
+                self.cache.put(zobrist, boardScore)
+                scores[index] += boardScore
+        return scores
+
+    def score_placements(self, blockfield, blockType, placements):
+        """Score the field after each placement, including lines it clears."""
+        oldTiles = blockfield.get_copy_of_tiles()
+        if self.batchEvaluation and numpy is not None and placements:
+            return self.evaluate_batch(blockfield, oldTiles, blockType, placements)
+        scores = []
+        for placement in placements:
+            (record, completedLines, blockRows) = self.apply_placement(blockfield, oldTiles, blockType, placement)
+            scores.append(self.placement_score(self.board_score(blockfield), completedLines, blockRows))
+            blockfield.undo(record)
+        return scores
+
+    def beam(self, scores):
+        # sorted is stable, so ties keep generation order like the original
+        # "first strictly better score wins" loop.
+        return sorted(range(len(scores)), key=lambda i: -scores[i])[:self.beamWidth]
+
+    def lookahead(self, blockfield, blockTypes, deadline):
+        """Best score after placing each of blockTypes on the field in turn.
+
+        A None entry is a block that is not known yet; its value is the mean
+        over every block type.  Lines cleared before this field are not
+        included, since they only add a constant to every outcome.
+        """
+        key = (blockfield.zobrist, blockTypes)
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        if self.clock() > deadline:
+            raise SearchTimeout()
+        blockType = blockTypes[0]
+        if blockType is None:
+            values = [self.lookahead(blockfield, (t,) + blockTypes[1:], deadline) for t in BLOCK_SHAPES]
+            value = sum(values) / len(values)
+        else:
+            value = self.lookahead_block(blockfield, blockType, blockTypes[1:], deadline)
+        self.cache.put(key, value)
+        return value
+
+    def lookahead_block(self, blockfield, blockType, blockTypes, deadline):
+        placements = self.generate_placements(blockfield, blockType, MAXCOL // 2 - 2, 0, 0)
+        if not placements:
+            return -float('inf')
+        scores = self.score_placements(blockfield, blockType, placements)
+        if not blockTypes:
+            return max(scores)
+        # Scoring a ply is the largest step between two checks, so look at
+        # the clock again before expanding its beam.
+        if self.clock() > deadline:
+            raise SearchTimeout()
+        oldTiles = blockfield.get_copy_of_tiles()
+        best = -float('inf')
+        for index in self.beam(scores):
+            (record, completedLines, _) = self.apply_placement(blockfield, oldTiles, blockType, placements[index])
+            try:
+                value = self.lookahead(blockfield, blockTypes, deadline)
+            finally:
+                blockfield.undo(record)
+            best = max(best, value + completedLines * self.completedLinesWeight)
+        return best
+
+    def settings(self):
+        """The tunable attributes: every weight plus the search options."""
+        return {
+            name: value for name, value in vars(self).items()
+            if name.endswith("Weight") or name in SEARCH_SETTINGS
+        }
+
+    def configure(self, settings):
+        for name, value in settings.items():
+            if not (name.endswith("Weight") or name in SEARCH_SETTINGS) or not hasattr(self, name):
+                raise ValueError(f"unknown AutoPlayer setting: {name}")
+            setattr(self, name, value)
+        self.speculation = None
+
+    def best_move(self, gamestate, searchDepth=None):
+        deadline = self.clock() + self.timeBudget
+        settings = (self.weights(), self.beamWidth, self.tickLimited)
+        if settings != self.cacheSettings:
+            self.cache.clear()
+            self.cacheSettings = settings
+        blockfield = BitBlockField.from_tiles(gamestate.get_tiles())
+        blockType = gamestate.get_falling_block_type()
+        placements = self.placements(blockfield, gamestate)
+        if not placements:
+            return NO_PLACEMENT
+        scores = self.score_placements(blockfield, blockType, placements)
+        ranking = sorted(range(len(placements)), key=lambda i: -scores[i])
+        nextType = gamestate.get_next_block_type() or None
+        oldTiles = blockfield.get_copy_of_tiles()
+        # Iterative deepening: each completed depth re-ranks the beam, and a
+        # depth that runs out of time is discarded.  A depth costs more than
+        # the one before it, so one that cannot finish is not started.
+        started = self.clock()
+        for depth in range(2, (self.searchDepth if searchDepth is None else searchDepth) + 1):
+            now = self.clock()
+            if depth > 2 and now + (now - started) > deadline:
+                break
+            started = now
+            blockTypes = (nextType,) + (None,) * (depth - 2)
+            beam = ranking[:self.beamWidth]
+            values = {}
+            try:
+                for index in beam:
+                    (record, completedLines, _) = self.apply_placement(blockfield, oldTiles, blockType, placements[index])
+                    try:
+                        value = self.lookahead(blockfield, blockTypes, deadline)
+                    finally:
+                        blockfield.undo(record)
+                    values[index] = value + completedLines * self.completedLinesWeight
+            except SearchTimeout:
+                break
+            ranking = sorted(beam, key=lambda i: -values[i]) + ranking[self.beamWidth:]
+        return placements[ranking[0]]
+
+class GameSnapshot:
+    """Immutable, picklable copy of the GameState getters AutoPlayer reads."""
+    def __init__(self, gamestate):
+        self.__tiles = tuple(tuple(row) for row in gamestate.get_tiles())
+        self.__falling_block_type = gamestate.get_falling_block_type()
+        self.__falling_block_position = gamestate.get_falling_block_position()
+        self.__falling_block_angle = gamestate.get_falling_block_angle()
+        self.__next_block_type = gamestate.get_next_block_type()
+        self.__score = gamestate.get_score()
+        self.__column_heights = tuple(gamestate.get_column_heights())
+        self.__column_holes = tuple(gamestate.get_column_holes())
+        self.__column_overhangs = tuple(gamestate.get_column_overhangs())
+
+    def get_falling_block_position(self):
+        return self.__falling_block_position
+
+    def get_falling_block_angle(self):
+        return self.__falling_block_angle
+
+    def get_falling_block_type(self):
+        return self.__falling_block_type
+
+    def get_next_block_type(self):
+        return self.__next_block_type
+
+    def get_tiles(self):
+        return [tuple(row) for row in self.__tiles]
+
+    def get_column_heights(self):
+        return self.__column_heights
+
+    def get_column_holes(self):
+        return self.__column_holes
+
+    def get_column_overhangs(self):
+        return self.__column_overhangs
+
+    def get_score(self):
+        return self.__score
+
+    def matches(self, gamestate, same_row=False):
+        """True if the AutoPlayer would decide the same for gamestate.
+
+        The falling block may have fallen further than in the snapshot, as
+        long as every row it could reach from either height is empty, which
+        leaves its direct placements unchanged.  Tick-limited placements
+        depend on the row the block starts from, so with ``same_row`` it
+        must not have fallen at all.
+        """
+        (x, y) = gamestate.get_falling_block_position()
+        (snapshot_x, snapshot_y) = self.__falling_block_position
+        if (
+            x != snapshot_x or y < snapshot_y or (same_row and y != snapshot_y)
+            or self.__falling_block_angle != gamestate.get_falling_block_angle()
+            or self.__falling_block_type != gamestate.get_falling_block_type()
+            or self.__next_block_type != gamestate.get_next_block_type()
+        ):
+            return False
+        tiles = tuple(tuple(row) for row in gamestate.get_tiles())
+        if tiles != self.__tiles:
+            return False
+        return y == snapshot_y or not any(any(row) for row in tiles[:y + 4])
+
+# The AutoPlayer of the current worker thread or process, set up by
+# init_worker when the executor starts it, so its cache survives between
+# decisions and is never shared with another thread.
+worker_state = threading.local()
+
+def init_worker(autoplayer=None):
+    worker_state.autoplayer = autoplayer if autoplayer is not None else AutoPlayer()
+
+def search_snapshot(settings, snapshot):
+    autoplayer = worker_state.autoplayer
+    autoplayer.configure(settings)
+    return autoplayer.best_move(snapshot)
+
+class BackgroundAutoPlayer:
+    """Runs AutoPlayer.best_move on a worker so the Tk loop never waits on it.
+
+    When a new block spawns, a GameSnapshot is submitted to the worker and
+    the block falls untouched until the decision arrives.  If it has not
+    arrived after maxWaitTicks drops, a depth-1 search on the calling
+    thread is used instead and the late result is discarded.
+
+    With speculativeSearch, the next block's search is submitted as soon as
+    a decision is played, on the predicted board, so it runs while the
+    current block falls and is usually done by the time the next spawns.
+    """
+    def __init__(self, autoplayer, use_processes=False, max_wait_ticks=3):
+        self.autoplayer = autoplayer
+        self.maxWaitTicks = max_wait_ticks
+        self.late = 0
+        # A worker thread gets an AutoPlayer of its own, kept here so it
+        # can be inspected; a worker process creates its own copy.
+        if use_processes:
+            self.worker = None
+            self.__executor = ProcessPoolExecutor(max_workers=1, initializer=init_worker)
+        else:
+            self.worker = AutoPlayer()
+            self.__executor = ThreadPoolExecutor(max_workers=1, initializer=init_worker, initargs=(self.worker,))
+        self.__pending = None
+        self.__snapshot = None
+        self.__speculation = None
+        self.__waited = 0
+
+    @property
+    def decisions(self):
+        return self.autoplayer.decisions
+
+    def next_move(self, gamestate):
+        autoplayer = self.autoplayer
+        x, y = gamestate.get_falling_block_position()
+        # An instant placement drops its block, so every call without a
+        # search in flight is for a new block.
+        if y < autoplayer.prevY or (autoplayer.instantPlacement and not self.__pending):
+            if self.__pending:
+                self.__pending.cancel()
+            (speculation, self.__speculation) = (self.__speculation, None)
+            if speculation and speculation.snapshot.matches(gamestate, autoplayer.tickLimited):
+                autoplayer.speculationHits += 1
+                (self.__snapshot, self.__pending) = speculation
+            else:
+                if speculation:
+                    speculation.decision.cancel()
+                    autoplayer.speculationMisses += 1
+                self.__snapshot = GameSnapshot(gamestate)
+                self.__pending = self.__executor.submit(search_snapshot, autoplayer.settings(), self.__snapshot)
+            self.__waited = 0
+        autoplayer.prevY = y
+        if self.__pending:
+            if self.__pending.done():
+                autoplayer.bestPlacement = self.__pending.result()
+            elif self.__waited >= self.maxWaitTicks:
+                self.__pending.cancel()
+                self.late += 1
+                autoplayer.bestPlacement = autoplayer.best_move(self.__snapshot, 1)
+            else:
+                self.__waited += 1
+                return
+            self.__pending = None
+            autoplayer.decisions += 1
+            if autoplayer.speculativeSearch:
+                snapshot = autoplayer.predict(gamestate)
+                if snapshot:
+                    future = self.__executor.submit(search_snapshot, autoplayer.settings(), snapshot)
+                    self.__speculation = Speculation(snapshot, future)
+        autoplayer.play_move(gamestate)
+
+    def close(self):
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+
+# Piece sources
+class PieceSource(ABC):
+    """Endless iterator of block numbers, indexes into Model.blocktypes.
+
+    Pieces are generated on demand, so a source takes O(1) memory and never
+    repeats.  clone() returns an independent source that will produce the
+    same pieces, which lets a search look ahead without consuming any.
+    """
+    def __iter__(self):
+        return self
+
+    @abstractmethod
+    def __next__(self):
+        pass
+
+    @abstractmethod
+    def clone(self):
+        pass
+
+    def peek(self, count):
+        """The next ``count`` pieces, without consuming them."""
+        source = self.clone()
+        return [next(source) for _ in range(count)]
+
+class UniformPieceSource(PieceSource):
+    """Every block type equally likely, independently of the last one."""
+    def __init__(self, seed=None):
+        self.__rand = random.Random(seed)
+
+    def __next__(self):
+        return self.__rand.randint(0, len(BLOCK_SHAPES) - 1)
+
+    def clone(self):
+        source = UniformPieceSource()
+        source.__rand.setstate(self.__rand.getstate())
+        return source
+
+class SevenBagPieceSource(PieceSource):
+    """Deals the seven block types in a shuffled bag, refilled when empty."""
+    def __init__(self, seed=None):
+        self.__rand = random.Random(seed)
+        self.__bag = []
+
+    def __next__(self):
+        if not self.__bag:
+            self.__bag = list(range(len(BLOCK_SHAPES)))
+            self.__rand.shuffle(self.__bag)
+        return self.__bag.pop()
+
+    def clone(self):
+        source = SevenBagPieceSource()
+        source.__rand.setstate(self.__rand.getstate())
+        source.__bag = list(self.__bag)
+        return source
+
+class HashedPieceSource(PieceSource):
+    """Uniform pieces where piece i is a hash of (seed, i), so it can seek.
+
+    Uses the SplitMix64 finaliser; seek() jumps to any position in O(1).
+    """
+    MASK = (1 << 64) - 1
+
+    def __init__(self, seed=None, index=0):
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.index = index
+
+    def piece(self, index):
+        z = (self.seed * 0xD1342543DE82EF95 + (index + 1) * 0x9E3779B97F4A7C15) & self.MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & self.MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & self.MASK
+        return (z ^ (z >> 31)) % len(BLOCK_SHAPES)
+
+    def __next__(self):
+        value = self.piece(self.index)
+        self.index += 1
+        return value
+
+    def seek(self, index):
+        self.index = index
+
+    def clone(self):
+        return HashedPieceSource(self.seed, self.index)
+
+    def peek(self, count):
+        return [self.piece(self.index + i) for i in range(count)]
+
+PIECE_SOURCES = {
+    "uniform": UniformPieceSource,
+    "bag": SevenBagPieceSource,
+    "hashed": HashedPieceSource,
+}
+
+# Headless simulation
+class HeadlessController:
+    """Stands in for Controller when a Model runs without a display."""
+    def __init__(self, seed=42, piece_source=PIECE_SOURCE):
+        self.pieces = PIECE_SOURCES[piece_source](seed)
+        self.lost = False
+        self.__score = 0
+
+    def get_random_blocknum(self):
+        return next(self.pieces)
+
+    def register_block(self, block):
+        pass
+
+    def unregister_block(self, block):
+        pass
+
+    def update_blockfield(self, blockfield):
+        pass
+
+    def block_dropped(self, block, start_y, cleared_rows):
+        pass
+
+    def update_score(self, score):
+        self.__score = score
+
+    @property
+    def score(self):
+        return self.__score
+
+    def game_over(self):
+        self.lost = True
+
+class Simulator:
+    """Plays AutoPlayer games as fast as possible, without Tk or a clock.
+
+    Every Model.update drops the falling block one row, and the AutoPlayer
+    gets one move and one rotation per drop, as in Controller.run.
+    """
+    def __init__(self, seed=42, autoplayer=None, piece_source=PIECE_SOURCE, controller=None):
+        self.controller = controller if controller else HeadlessController(seed, piece_source)
+        self.model = Model(self.controller, realtime=False)
+        self.gamestate = GameState(self.model)
+        self.autoplayer = autoplayer if autoplayer else AutoPlayer(self.controller)
+
+    def steps(self, max_pieces=None):
+        """Play one game, yielding after every Model.update.
+
+        Each step yields whether a block landed in it; when one did, the
+        next block has just spawned and has not been decided yet.
+        """
+        self.controller.lost = False
+        self.model.start()
+        self.model.enable_autoplay(True)
+        dropped = False
+        while not self.controller.lost and (max_pieces is None or self.model.landings < max_pieces):
+            if dropped:
+                self.model.reset_counts()
+                self.autoplayer.next_move(self.gamestate)
+            (dropped, landed) = self.model.update()
+            yield landed
+
+    def play(self, max_pieces=None):
+        """Play one game and return its statistics."""
+        start = time.perf_counter()
+        decisions = self.autoplayer.decisions
+        hits = self.autoplayer.speculationHits
+        for _ in self.steps(max_pieces):
+            pass
+        pieces = self.model.landings
+        seconds = time.perf_counter() - start
+        decisions = self.autoplayer.decisions - decisions
+        return {
+            "score": self.model.score,
+            "lines": self.model.lines,
+            "pieces": pieces,
+            "decisions": decisions,
+            "seconds": seconds,
+            "pieces_per_second": pieces / seconds if seconds else 0.0,
+            "decisions_per_second": decisions / seconds if seconds else 0.0,
+            "speculation_hits": self.autoplayer.speculationHits - hits,
+        }
+
+# Vectorized environment
+def build_action_masks():
+    """Bitboard row masks of every block type for every VectorEnv action.
+
+    Action ``angle * MAXCOL + column`` puts the piece's leftmost tile in
+    ``column``, clipped so the rotation stays inside the field.  Block types
+    are in BLOCK_SHAPES order, which is also Model.blocktypes order.
+    """
+    table = []
+    for block_type in BLOCK_SHAPES:
+        actions = []
+        for rotation in ROTATIONS[block_type]:
+            (xmin, _, xmax, _) = rotation.bounding_box
+            masks = rotation.row_masks + (0,) * (4 - len(rotation.row_masks))
+            for column in range(MAXCOL):
+                block_x = min(column, MAXCOL - 1 - (xmax - xmin)) - xmin
+                actions.append(tuple(mask << block_x if block_x >= 0 else mask >> -block_x for mask in masks))
+        table.append(tuple(actions))
+    return tuple(table)
+
+ACTION_MASKS = build_action_masks()
+
+def build_action_heights():
+    """Middle row of each block type's tiles for every VectorEnv action.
+
+    Added to the landing row, this is AutoPlayer's block height feature,
+    (ymin + ymax) / 2 of the landed tiles.
+    """
+    table = []
+    for block_type in BLOCK_SHAPES:
+        actions = []
+        for rotation in ROTATIONS[block_type]:
+            (_, ymin, _, ymax) = rotation.bounding_box
+            actions.extend([(ymin + ymax) / 2] * MAXCOL)
+        table.append(tuple(actions))
+    return tuple(table)
+
+ACTION_HEIGHTS = build_action_heights()
+
+VectorObservation = namedtuple("VectorObservation", ["rows", "pieces", "next_pieces"])
+
+class VectorEnv:
+    """K games stepped in lockstep, for training and tuning.
+
+    The boards are one (K, MAXROW) NumPy array of bitboard rows, as in
+    BitBlockField, and pieces are block numbers drawn from one piece source
+    per game (seeded ``seed + k``).  Each step hard-drops every game's
+    falling piece at its chosen action, with the rules of Block.drop,
+    BlockField.land and Model.drop_block: the piece stops above the first
+    row it would collide with, landing in row 0 ends the game, and full
+    rows are cleared and scored.  A finished game stays finished, and
+    ignores its actions, until it is reset.
+    """
+    ACTIONS = len(ACTION_MASKS[0])
+    SCORES = (0, 100, 400, 800, 1600)
+    FULL_ROW = (1 << MAXCOL) - 1
+
+    def __init__(self, count, seed=0, piece_source=PIECE_SOURCE):
+        if numpy is None:
+            raise RuntimeError("VectorEnv needs NumPy")
+        self.count = count
+        self.__masks = numpy.array(ACTION_MASKS, dtype=numpy.int64)
+        self.__heights = numpy.array(ACTION_HEIGHTS)
+        self.__scores = numpy.array(self.SCORES)
+        # Four full rows below the field make the floor a collision.
+        self.__window = numpy.arange(MAXROW)[:, None] + numpy.arange(4)
+        self.__board = numpy.zeros((count, MAXROW + 4), dtype=numpy.int64)
+        self.__board[:, MAXROW:] = self.FULL_ROW
+        self.__sources = [PIECE_SOURCES[piece_source](seed + k) for k in range(count)]
+        self.pieces = numpy.zeros(count, dtype=numpy.int64)
+        self.next_pieces = numpy.zeros(count, dtype=numpy.int64)
+        self.score = numpy.zeros(count, dtype=numpy.int64)
+        self.lines = numpy.zeros(count, dtype=numpy.int64)
+        self.placed = numpy.zeros(count, dtype=numpy.int64)
+        self.done = numpy.zeros(count, dtype=bool)
+        self.reset()
+
+    @property
+    def rows(self):
+        return self.__board[:, :MAXROW]
+
+    def observation(self):
+        return VectorObservation(self.rows.copy(), self.pieces.copy(), self.next_pieces.copy())
+
+    def reset(self, games=None):
+        """Start new games on the given indexes (all by default).
+
+        Like Model.restart, the field is emptied and the next piece is
+        drawn before the falling one; the piece sequence carries on.
+        """
+        games = range(self.count) if games is None else games
+        for k in games:
+            self.__board[k, :MAXROW] = 0
+            self.next_pieces[k] = next(self.__sources[k])
+            self.pieces[k] = next(self.__sources[k])
+            self.score[k] = self.lines[k] = self.placed[k] = 0
+            self.done[k] = False
+        return self.observation()
+
+    def __drop(self, board, masks):
+        """Landing row of each piece, and whether landing there loses."""
+        collides = (board[:, self.__window] & masks[:, None, :]).any(axis=2)
+        # Falls while the row below is free; the padding guarantees a stop.
+        rest = collides[:, 1:].argmax(axis=1)
+        return rest, collides[:, 0] | (rest == 0)
+
+    def __land(self, board, masks, rest):
+        """Place the pieces and clear full rows in place; return the counts."""
+        games = numpy.arange(len(board))[:, None]
+        board[games, rest[:, None] + numpy.arange(4)] |= masks
+        rows = board[:, :MAXROW]
+        full = rows == self.FULL_ROW
+        cleared = full.sum(axis=1)
+        changed = numpy.flatnonzero(cleared)
+        if len(changed):
+            # Move the full rows to the top, keeping the others in order,
+            # then empty them.
+            order = numpy.argsort(~full[changed], axis=1, kind="stable")
+            kept = numpy.take_along_axis(rows[changed], order, axis=1)
+            kept[numpy.arange(MAXROW) < cleared[changed, None]] = 0
+            rows[changed] = kept
+        return cleared
+
+    def step(self, actions):
+        """Drop every live game's piece; return (observation, rewards, done).
+
+        ``rewards`` is the line-clear score of this step.
+        """
+        actions = numpy.asarray(actions)
+        masks = self.__masks[self.pieces, actions]
+        (rest, lost) = self.__drop(self.__board, masks)
+        lost &= ~self.done
+        live = numpy.flatnonzero(~self.done & ~lost)
+        rewards = numpy.zeros(self.count, dtype=numpy.int64)
+        if len(live):
+            board = self.__board[live]
+            cleared = self.__land(board, masks[live], rest[live])
+            self.__board[live] = board
+            rewards[live] = self.__scores[cleared]
+            self.score += rewards
+            self.lines[live] += cleared
+            self.placed[live] += 1
+            self.pieces[live] = self.next_pieces[live]
+            for k in live:
+                self.next_pieces[k] = next(self.__sources[k])
+        self.done |= lost
+        return self.observation(), rewards, self.done.copy()
+
+    def afterstates(self):
+        """The result of every action in every game, without playing it.
+
+        Returns (rows, cleared, valid, rest), shaped (K, ACTIONS, MAXROW)
+        and (K, ACTIONS): the rows after the landing and line clears, the
+        number of lines cleared, whether the action keeps the game going,
+        and the row the piece lands in.
+        """
+        board = numpy.repeat(self.__board, self.ACTIONS, axis=0)
+        masks = self.__masks[self.pieces].reshape(-1, 4)
+        (rest, lost) = self.__drop(board, masks)
+        cleared = self.__land(board, masks, rest)
+        shape = (self.count, self.ACTIONS)
+        valid = ~lost.reshape(shape) & ~self.done[:, None]
+        return board[:, :MAXROW].reshape(shape + (MAXROW,)), cleared.reshape(shape), valid, rest.reshape(shape)
+
+    def action_scores(self, autoplayer):
+        """Score of every action in every game by the AutoPlayer's weights.
+
+        Shaped (K, ACTIONS), -inf for actions that end the game.  As in
+        AutoPlayer.apply_placement, the block height is the middle of the
+        landed tiles or, when lines are cleared, of the rows that changed
+        (here by occupancy, since the boards hold no colours).
+        """
+        (rows, cleared, valid, rest) = self.afterstates()
+        heights = rest + self.__heights[self.pieces]
+        if cleared.any():
+            changed = rows != self.rows[:, None, :]
+            top = changed.argmax(axis=2)
+            bottom = MAXROW - 1 - changed[:, :, ::-1].argmax(axis=2)
+            middle = numpy.where(changed.any(axis=2), (top + bottom) / 2, 0)
+            heights = numpy.where(cleared > 0, middle, heights)
+        features = extract_features_batch(rows.reshape(-1, MAXROW), cleared.ravel(), heights.ravel())
+        scores = (features @ numpy.array(autoplayer.weights())).reshape(valid.shape)
+        scores[~valid] = -numpy.inf
+        return scores
+
+    def greedy_actions(self, autoplayer):
+        """Each game's best action by the AutoPlayer's weights, one ply deep."""
+        return self.action_scores(autoplayer).argmax(axis=1)
+
+# High scores
+class HighScoreStore:
+    """Daily and all-time high-score tables, persisted off the UI thread.
+
+    Every result is appended to a JSON-lines log, and the top ``keep``
+    scores of the day and of all time are kept in min-heaps.  A background
+    writer appends new results in batches, at most once every ``debounce``
+    seconds, and every ``compact_every`` results it writes the
+    tables to ``path`` (temp file + rename, so a crash never leaves a
+    half-written file) and empties the log.  ``path`` keeps the original
+    high_scores.json format, with an ``id`` added to every entry so a
+    result that is both in the tables and in the log is loaded once.
+    """
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, path="high_scores.json", keep=25, debounce=2.0, compact_every=200):
+        self.path = path
+        self.log_path = path + ".log"
+        self.keep = keep
+        self.debounce = debounce
+        self.compact_every = compact_every
+        self.__all_time = []
+        self.__daily = []
+        self.__day = datetime.now().strftime("%Y-%m-%d")
+        self.__sequence = 0
+        self.__version = 0
+        self.__tables = None
+        self.__pending = []
+        self.__logged = 0
+        self.__closing = False
+        self.__lock = threading.Condition()
+        self.load()
+        self.__writer = threading.Thread(target=self.__write_loop, daemon=True)
+        self.__writer.start()
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def tables(self):
+        """{"daily": [...], "all_time": [...]}, best first, as View reads it."""
+        if self.__tables is None:
+            self.__tables = {
+                "daily": self.__sorted(self.__daily),
+                "all_time": self.__sorted(self.__all_time),
+            }
+        return self.__tables
+
+    def __sorted(self, heap):
+        return [
+            {"score": score, "date": date, "id": entry_id}
+            for (score, _, date, entry_id) in sorted(heap, reverse=True)
+        ]
+
+    def __push(self, heap, score, date, entry_id):
+        # The sequence number breaks ties in favour of the earlier entry
+        # and keeps the dates from being compared.
+        self.__sequence += 1
+        entry = (score, -self.__sequence, date, entry_id)
+        if len(heap) < self.keep:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def __insert(self, score, date, entry_id):
+        self.__push(self.__all_time, score, date, entry_id)
+        if date[:10] != self.__day:
+            if date[:10] < self.__day:
+                return
+            self.__day = date[:10]
+            self.__daily = []
+        self.__push(self.__daily, score, date, entry_id)
+
+    @staticmethod
+    def __key(entry):
+        # Files written before entries had ids fall back to (score, date).
+        return entry.get("id") or (entry["score"], entry["date"])
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                tables = json.load(f)
+        except FileNotFoundError:
+            tables = {"daily": [], "all_time": []}
+        except ValueError:
+            # The next compaction would overwrite it, so keep it for repair.
+            os.replace(self.path, self.path + ".corrupt")
+            print("High scores: %s is corrupt, moved to %s.corrupt" % (self.path, self.path), file=sys.stderr)
+            tables = {"daily": [], "all_time": []}
+        # A result can be in both tables; count each copy in the table that
+        # holds more of them.
+        copies = {}
+        for table in ("all_time", "daily"):
+            counts = {}
+            for entry in tables.get(table, []):
+                key = self.__key(entry)
+                counts[key] = counts.get(key, 0) + 1
+                if counts[key] > copies.get(key, (None, 0))[1]:
+                    copies[key] = (entry, counts[key])
+        for (entry, count) in copies.values():
+            for _ in range(count):
+                self.__insert(entry["score"], entry["date"], entry.get("id"))
+        # Results appended after the last compaction.  A crash can leave a
+        # torn last line, and a crash during compaction entries that are
+        # already in the tables; both are skipped.  Unreadable lines are
+        # copied to a .corrupt file, since compaction empties the log.
+        corrupt = []
+        try:
+            with open(self.log_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        corrupt.append(line if line.endswith("\n") else line + "\n")
+                        continue
+                    self.__logged += 1
+                    key = self.__key(entry)
+                    (_, count) = copies.get(key, (None, 0))
+                    if count:
+                        copies[key] = (entry, count - 1)
+                        continue
+                    self.__insert(entry["score"], entry["date"], entry.get("id"))
+        except FileNotFoundError:
+            pass
+        if corrupt:
+            with open(self.log_path + ".corrupt", 'a') as f:
+                f.write("".join(corrupt))
+            print("High scores: skipped %d unreadable line(s) in %s, copied to %s.corrupt"
+                  % (len(corrupt), self.log_path, self.log_path), file=sys.stderr)
+        self.__tables = None
+        self.__version += 1
+
+    def add(self, score, now=None):
+        date = (now or datetime.now()).strftime(self.DATE_FORMAT)
+        entry_id = uuid.uuid4().hex
+        with self.__lock:
+            self.__insert(score, date, entry_id)
+            self.__pending.append({"score": score, "date": date, "id": entry_id})
+            self.__lock.notify()
+        self.__tables = None
+        self.__version += 1
+
+    def __write_loop(self):
+        while True:
+            with self.__lock:
+                while not self.__pending and not self.__closing:
+                    self.__lock.wait()
+                # Batch whatever else arrives within the debounce window.
+                deadline = time.monotonic() + self.debounce
+                while not self.__closing and time.monotonic() < deadline:
+                    self.__lock.wait(deadline - time.monotonic())
+                (pending, self.__pending) = (self.__pending, [])
+                closing = self.__closing
+                logged = self.__logged + len(pending)
+                tables = None
+                if logged >= self.compact_every or (closing and logged):
+                    tables = {"daily": self.__sorted(self.__daily), "all_time": self.__sorted(self.__all_time)}
+            if pending:
+                self.__append(pending)
+            if tables:
+                self.__compact(tables)
+            if closing:
+                return
+
+    def __append(self, entries):
+        with open(self.log_path, 'a') as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self.__logged += len(entries)
+
+    def __compact(self, tables):
+        """Write the tables atomically and start a new, empty log."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(tables, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        open(self.log_path, 'w').close()
+        self.__logged = 0
+
+    def close(self):
+        """Write everything still pending and stop the writer."""
+        with self.__lock:
+            self.__closing = True
+            self.__lock.notify()
+        self.__writer.join()
+
+# Profiling
+def percentile(values, fraction):
+    """Nearest-rank percentile: the smallest value with at least
+    ``fraction`` of the values at or below it.  0.0 when there are none.
+
+    The profiler, selfplay.py and the benchmarks all use this one.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class RollingStats:
+    """The last ``size`` samples of one measurement, with percentiles."""
+    def __init__(self, size=1000):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction):
+        return percentile(self.samples, fraction)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": max(self.samples) if self.samples else 0.0,
+        }
+
+class Profiler:
+    """Opt-in instrumentation of the game's hot paths.
+
+    Methods are timed by replacing them on the instances passed to
+    ``instrument``, so nothing is measured, and nothing costs anything,
+    unless a Profiler has been attached.  Durations are in seconds.
+    """
+    CANVAS_CREATE_METHODS = ("create_rectangle", "create_text")
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.stats = {}
+        self.created = 0
+        self.deleted = 0
+
+    def record(self, label, value):
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = RollingStats(self.window)
+        stats.add(value)
+
+    def timed(self, label, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(label, time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, obj, name, label):
+        setattr(obj, name, self.timed(label, getattr(obj, name)))
+
+    def instrument_autoplayer(self, autoplayer, prefix="ai"):
+        self.instrument(autoplayer, "best_move", prefix + ".best_move")
+        # Per-candidate cost: landing and undoing a placement versus
+        # scoring the resulting field.
+        self.instrument(autoplayer, "apply_placement", prefix + ".simulate")
+        self.instrument(autoplayer, "board_score", prefix + ".heuristics")
+        self.instrument(autoplayer, "evaluate_batch", prefix + ".heuristics_batch")
+
+    def count_canvas_items(self, canvas):
+        def counted_create(func):
+            def wrapper(*args, **kwargs):
+                self.created += 1
+                return func(*args, **kwargs)
+            return wrapper
+
+        def counted_delete(*args):
+            self.deleted += len(args)
+            return delete(*args)
+        for name in self.CANVAS_CREATE_METHODS:
+            setattr(canvas, name, counted_create(getattr(canvas, name)))
+        delete = canvas.delete
+        canvas.delete = counted_delete
+
+    def end_frame(self):
+        self.record("canvas.created_per_frame", self.created)
+        self.record("canvas.deleted_per_frame", self.deleted)
+        self.created = self.deleted = 0
+
+    def summary(self):
+        return {label: stats.summary() for label, stats in sorted(self.stats.items())}
+
+    def overlay_text(self):
+        lines = []
+        for label, stats in sorted(self.stats.items()):
+            if label.startswith("canvas."):
+                lines.append(f"{label}: p50 {stats.percentile(0.5):.0f} p95 {stats.percentile(0.95):.0f}")
+            else:
+                lines.append(f"{label}: p50 {stats.percentile(0.5) * 1000:.2f}ms p95 {stats.percentile(0.95) * 1000:.2f}ms p99 {stats.percentile(0.99) * 1000:.2f}ms")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
 
 # Controller
 class Controller:
-    def __init__(self):
+    def __init__(self, profile_path=None):
         self.__root = Tk()
         self.__root.attributes('-fullscreen', True)
         self.__root.configure(bg='black')
         self.__root.bind('<Any-KeyPress>', self.exit_screensaver)
         self.__root.bind('<Motion>', self.exit_screensaver)
         self.__root.bind_all("<Key>", self.key)
+        self.__root.bind('<Visibility>', self.visibility_changed)
+        self.__root.bind('<Unmap>', lambda event: self.set_hidden(True))
+        self.__root.bind('<Map>', lambda event: self.set_hidden(False))
+        self.__root.bind('<FocusIn>', lambda event: self.set_focused(True))
+        self.__root.bind('<FocusOut>', lambda event: self.set_focused(False))
+        self.__hidden = False
+        self.__focused = True
         self.__running = True
         self.__destroyed = False
         self.__score = 0
         self.__autoplay = True
-        self.__high_scores = self.load_high_scores()
-        self.__gen_random()
-        self.__model = Model(self)
+        self.__high_scores = HighScoreStore()
+        self.__pieces = PIECE_SOURCES[PIECE_SOURCE](42)
+        # The scheduler in run() calls Model.update once per move_time, so
+        # the model itself does not look at the clock.
+        self.__events = BatchedControllerEvents(self)
+        self.__model = Model(self, realtime=False, events=self.__events)
         self.__gamestate_api = GameState(self.__model)
         self.__view = View(self.__root, self)
         self.__blockfield = self.__model.blockfield
@@ -877,43 +2789,42 @@ class Controller:
         self.__model.start()
         self.__model.enable_autoplay(True)
         self.__autoplayer = AutoPlayer(self)
-
-    def load_high_scores(self):
-        try:
-            with open('high_scores.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {"daily": [], "all_time": []}
-
-    def save_high_scores(self):
-        with open('high_scores.json', 'w') as f:
-            json.dump(self.__high_scores, f)
+        self.__autoplayer.instantPlacement = INSTANT_PLACEMENT
+        if AI_WORKER:
+            self.__autoplayer = BackgroundAutoPlayer(self.__autoplayer, use_processes=AI_WORKER == "process")
+        self.__profile_path = profile_path
+        self.__profiler = None
+        if profile_path:
+            self.__attach_profiler()
+
+    def __attach_profiler(self):
+        profiler = self.__profiler = Profiler()
+        profiler.instrument(self.__model, "update", "model.update")
+        profiler.instrument(self.__view, "update", "view.update")
+        self.__tick = profiler.timed("controller.tick", self.__tick)
+        profiler.instrument(self.__view.blockfield_view, "redraw", "blockfield_view.redraw")
+        profiler.count_canvas_items(self.__view.canvas)
+        autoplayer = self.__autoplayer
+        if isinstance(autoplayer, BackgroundAutoPlayer):
+            profiler.instrument(autoplayer, "next_move", "ai.next_move")
+            if autoplayer.worker is not None:
+                profiler.instrument_autoplayer(autoplayer.worker, "ai.worker")
+            autoplayer = autoplayer.autoplayer
+        profiler.instrument_autoplayer(autoplayer)
+        self.__overlay_due = 0.0
 
     def add_score(self, score):
         if score <= 0 or self.__model._Model__score_added:
             return
-        now = datetime.now()
-        date_str = now.strftime("%Y-%m-%d %H:%M:%S")
-        self.__high_scores["all_time"].append({"score": score, "date": date_str})
-        self.__high_scores["all_time"] = sorted(self.__high_scores["all_time"], key=lambda x: x["score"], reverse=True)[:25]
-        daily = [s for s in self.__high_scores.get("daily", []) if datetime.strptime(s["date"], "%Y-%m-%d %H:%M:%S").date() == now.date()]
-        daily.append({"score": score, "date": date_str})
-        daily = sorted(daily, key=lambda x: x["score"], reverse=True)[:25]
-        self.__high_scores["daily"] = daily
+        self.__high_scores.add(score)
         self.__model._Model__score_added = True
-        self.save_high_scores()
 
-    def __gen_random(self):
-        self.__rand = random.Random()
-        self.__rand.seed(42)
-        self.rand_ix = 0
-        self.maxrand = 100000
-        maxblocktype = 6
-        self.randlist = [self.__rand.randint(0, maxblocktype) for _ in range(self.maxrand)]
+    @property
+    def pieces(self):
+        return self.__pieces
 
     def get_random_blocknum(self):
-        self.rand_ix = (self.rand_ix + 1) % self.maxrand
-        return self.randlist[self.rand_ix]
+        return next(self.__pieces)
 
     def register_block(self, block):
         if not self.__destroyed:
@@ -925,14 +2836,34 @@ class Controller:
 
     def update_blockfield(self, blockfield):
         self.__blockfield = blockfield
-        if not self.__destroyed:
+        if not self.__destroyed and not self.__hidden:
             self.__view.update_blockfield(blockfield)
 
     def update_score(self, score):
         self.__score = score
-        if not self.__destroyed:
+        if not self.__destroyed and not self.__hidden:
             self.__view.display_score(score)
 
+    def block_dropped(self, block, start_y, cleared_rows):
+        if DROP_ANIMATION_TIME and not self.__destroyed and not self.__hidden:
+            self.__view.animate_drop(block, start_y, cleared_rows)
+
+    def visibility_changed(self, event):
+        self.set_hidden(event.state == "VisibilityFullyObscured")
+
+    def set_hidden(self, hidden):
+        """Stop drawing while nobody can see the window; resync once it is back."""
+        was_hidden = self.__hidden
+        self.__hidden = hidden
+        if was_hidden and not hidden and not self.__destroyed:
+            self.__events.flush()
+            self.__view.update_blockfield(self.__blockfield)
+            self.__view.display_score(self.__score)
+            self.__next_frame = time.perf_counter()
+
+    def set_focused(self, focused):
+        self.__focused = focused
+
     @property
     def score(self):
         return self.__score
@@ -979,20 +2910,10 @@ class Controller:
         elif event.char == "r":
             self.restart_game()
 
-    def run(self):
-        dropped = False
-        while self.__running and not self.__destroyed:
-            try:
-                if not self.__lost:
-                    if dropped and self.__autoplay:
-                        self.__model.reset_counts()
-                        self.__autoplayer.next_move(self.__gamestate_api)
-                    (dropped, _landed) = self.__model.update()
-                self.__view.update(self.__score, self.__high_scores)
-                self.__root.update()
-            except tkinter.TclError:
-                self.__running = False
-                break
+    def __close(self):
+        if isinstance(self.__autoplayer, BackgroundAutoPlayer):
+            self.__autoplayer.close()
+        self.__high_scores.close()
         if not self.__destroyed:
             self.__destroyed = True
             try:
@@ -1000,7 +2921,100 @@ class Controller:
             except tkinter.TclError:
                 pass
 
+    def __step(self):
+        if self.__lost or self.__view.animating:
+            # Instant drops wait for the last one to finish sliding down
+            return
+        if self.__dropped and self.__autoplay:
+            self.__model.reset_counts()
+            self.__autoplayer.next_move(self.__gamestate_api)
+        (self.__dropped, _landed) = self.__model.update()
+
+    def __tick(self):
+        if not self.__running or self.__destroyed:
+            self.__close()
+            return
+        try:
+            # Fixed timestep: one logic step per move_time of elapsed time,
+            # independent of how often frames are rendered.
+            now = time.perf_counter()
+            step = self.__model.move_time
+            # Behind a foreground window the saver rarely gets a
+            # FullyObscured event, but it does lose focus; both slow the
+            # game down, and so the AI searches, as well as the drawing.
+            speed = HIDDEN_SPEED if self.__hidden else 1.0 if self.__focused else BACKGROUND_SPEED
+            if not speed:
+                self.__lag = 0.0
+                self.__last_tick = now
+                self.__root.after(int(HIDDEN_POLL * 1000), self.__tick)
+                return
+            step /= speed
+            self.__lag += now - self.__last_tick
+            self.__last_tick = now
+            steps = 0
+            while self.__lag >= step:
+                if steps == MAX_CATCHUP_STEPS:
+                    self.__lag = 0.0
+                    break
+                self.__step()
+                self.__lag -= step
+                steps += 1
+            frame = 1.0 / (TARGET_FPS if self.__focused else BACKGROUND_FPS)
+            if self.__hidden:
+                delay = step - self.__lag
+            else:
+                if now >= self.__next_frame:
+                    self.__events.flush()
+                    self.__view.update(self.__score, self.__high_scores.tables, self.__high_scores.version)
+                    if self.__profiler:
+                        self.__profile_frame(now)
+                    self.__next_frame += frame
+                    if self.__next_frame < now:
+                        # Behind schedule: skip the missed frames
+                        self.__next_frame = now + frame
+                delay = min(step - self.__lag, self.__next_frame - now)
+            # Round up so Tk does not wake us just before anything is due
+            self.__root.after(int(max(delay, 0) * 1000) + 1, self.__tick)
+        except tkinter.TclError:
+            self.__running = False
+            self.__close()
+
+    def __profile_frame(self, now):
+        self.__profiler.end_frame()
+        self.__profiler.record("frame.interval", now - self.__last_frame)
+        self.__last_frame = now
+        if now >= self.__overlay_due:
+            self.__view.show_overlay(self.__profiler.overlay_text())
+            self.__overlay_due = now + 0.5
+
+    def run(self):
+        self.__dropped = False
+        self.__lag = 0.0
+        self.__last_tick = self.__next_frame = self.__last_frame = time.perf_counter()
+        self.__root.after(0, self.__tick)
+        try:
+            self.__root.mainloop()
+        except tkinter.TclError:
+            self.__running = False
+        self.__close()
+        if self.__profiler:
+            self.__profiler.dump(self.__profile_path)
+
 # Main
 if __name__ == "__main__":
-    controller = Controller()
-    controller.run()
+    parser = argparse.ArgumentParser(description="Tetris screen saver")
+    parser.add_argument("--headless", action="store_true", help="play one AutoPlayer game without a display and print its statistics as JSON")
+    parser.add_argument("--seed", type=int, default=42, help="piece sequence seed for --headless")
+    parser.add_argument("--pieces", type=int, default=None, help="stop a --headless game after this many pieces")
+    parser.add_argument("--piece-source", choices=sorted(PIECE_SOURCES), default=PIECE_SOURCE, help="piece sequence generator for --headless")
+    parser.add_argument("--instant", action="store_true", help="drop each block as soon as the AutoPlayer has decided where it goes")
+    parser.add_argument("--profile", metavar="PATH", default=None, help="time the hot paths, show them on screen and write a JSON report to PATH on exit")
+    args = parser.parse_args()
+    INSTANT_PLACEMENT = INSTANT_PLACEMENT or args.instant
+    if args.headless or DISABLE_DISPLAY:
+        autoplayer = AutoPlayer()
+        autoplayer.instantPlacement = INSTANT_PLACEMENT
+        print(json.dumps(Simulator(args.seed, autoplayer, args.piece_source).play(args.pieces)))
+    else:
+        controller = Controller(args.profile)
+        controller.run()